@@ -0,0 +1,69 @@
+"""
+Microbenchmark for Google Finance price extraction
+Compares the targeted extractor used by the scraper against the original
+full BeautifulSoup parse on saved quote pages, and checks both agree.
+
+    python scraper/benchmarks/bench_google_parse.py --iterations 50
+
+Fixtures in benchmarks/fixtures/ are trimmed copies of the quote page layout
+(price div, related-stock cards, inline data scripts); add real saved pages
+as google_finance_*.html to benchmark against them too.
+"""
+
+import os
+import sys
+import glob
+import timeit
+import argparse
+from typing import List
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from google_finance import extract_price, extract_price_bs4  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'google_finance_*.html')
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark Google Finance price extraction")
+    parser.add_argument('--iterations', type=int, default=50, help="Parses per fixture and parser")
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(FIXTURES))
+    if not paths:
+        print(f"No fixtures found at {FIXTURES}")
+        return 1
+
+    mismatches = 0
+    total_fast = total_full = 0.0
+    print(f"{'fixture':<36} {'price':>12} {'bs4 ms':>9} {'fast ms':>9} {'speedup':>8}")
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+
+        expected = extract_price_bs4(html)
+        actual = extract_price(html)
+        if actual != expected:
+            mismatches += 1
+            print(f"❌ {os.path.basename(path)}: extractor={actual} BeautifulSoup={expected}")
+
+        full = timeit.timeit(lambda: extract_price_bs4(html), number=args.iterations) / args.iterations
+        fast = timeit.timeit(lambda: extract_price(html), number=args.iterations) / args.iterations
+        total_full += full
+        total_fast += fast
+        print(f"{os.path.basename(path):<36} {str(expected):>12} {full * 1000:>9.3f} "
+              f"{fast * 1000:>9.3f} {full / fast:>7.0f}x")
+
+    print(f"Overall: {total_full / total_fast:.0f}x faster "
+          f"({total_full * 1000:.2f} ms -> {total_fast * 1000:.3f} ms per page set)")
+
+    if mismatches:
+        print(f"❌ {mismatches} fixture(s) disagree with the BeautifulSoup parser")
+        return 1
+    print("✅ All fixtures match the BeautifulSoup parser")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Cold-start benchmark for scraper/main.py
+Imports main.py in fresh interpreters under `python -X importtime` and reports
+the total import time plus the slowest top-level imports.
+
+    python scraper/benchmarks/bench_startup.py --runs 5 --json startup.json --max-ms 1500
+
+Supabase credentials are not needed: dummy values are used and no request is made.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_once() -> Tuple[float, Dict[str, int]]:
+    """
+    Import main.py in a fresh interpreter.
+    Returns: (total import time in ms, {module imported by main.py: cumulative us})
+    """
+    env = dict(os.environ)
+    env.setdefault('SUPABASE_URL', 'https://benchmark.supabase.co')
+    env.setdefault('SUPABASE_KEY', 'benchmark')
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=SCRAPER_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing main.py failed:\n{result.stderr[-2000:]}")
+
+    modules: Dict[str, int] = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown as two spaces per level after the separator
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0 and name.strip() == 'main':
+            total_us = int(cumulative)
+        elif depth == 1:
+            package = name.strip()
+            modules[package] = modules.get(package, 0) + int(cumulative)
+
+    return total_us / 1000, modules
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Measure scraper/main.py import time")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument('--top', type=int, default=10, help="Number of slowest imports to list")
+    parser.add_argument('--json', help="Write results to this file (for CI tracking)")
+    parser.add_argument('--max-ms', type=float, help="Fail if the median import time exceeds this")
+    args = parser.parse_args(argv)
+
+    # Warm the OS file cache / .pyc files so runs are comparable
+    import_once()
+
+    totals = []
+    modules: Dict[str, List[int]] = {}
+    for _ in range(args.runs):
+        total_ms, run_modules = import_once()
+        totals.append(total_ms)
+        for name, us in run_modules.items():
+            modules.setdefault(name, []).append(us)
+
+    median_ms = statistics.median(totals)
+    slowest = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in modules.items()),
+        key=lambda item: item[1], reverse=True
+    )[:args.top]
+
+    print(f"main.py import time: median {median_ms:.1f} ms "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}, runs {len(totals)})")
+    print("Slowest imports pulled in by main.py:")
+    for name, ms in slowest:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'median_ms': round(median_ms, 2),
+                'runs_ms': [round(t, 2) for t in totals],
+                'slowest': [{'module': name, 'ms': round(ms, 2)} for name, ms in slowest],
+            }, f, indent=2)
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        print(f"❌ Import time {median_ms:.1f} ms exceeds budget of {args.max_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import os
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from rate_limiter import throttle
+
+log = logging.getLogger(__name__)
+
+# Discord accepts at most 10 embeds per webhook message
+DISCORD_MAX_EMBEDS = 10
+# ... and at most 6000 characters of text across all embeds in a message
+DISCORD_MAX_EMBED_CHARS = 6000
+# Webhooks delivered in parallel during a flush
+DISCORD_FLUSH_WORKERS = int(os.environ.get("DISCORD_FLUSH_WORKERS", "4"))
+# Attempts per message (429s and 5xx are retried)
+DISCORD_MAX_ATTEMPTS = 5
+# Alerts summarised per digest embed (keeps the table inside Discord's 4096-char description)
+DIGEST_ROWS_PER_EMBED = 25
+
+
+class QueuedAlert:
+    """One queued alert: its embed, a short summary row for digests, and a failure callback"""
+    __slots__ = ('embed', 'summary', 'on_failure')
+
+    def __init__(self, embed: Dict, summary: Optional[Dict] = None,
+                 on_failure: Optional[Callable[[], None]] = None):
+        self.embed = embed
+        self.summary = summary
+        self.on_failure = on_failure
+
+
+def embed_length(embed: Dict) -> int:
+    """Characters Discord counts towards a message's embed text limit"""
+    length = len(embed.get('title') or '') + len(embed.get('description') or '')
+    length += len((embed.get('footer') or {}).get('text') or '')
+    length += len((embed.get('author') or {}).get('name') or '')
+    for field in embed.get('fields') or []:
+        length += len(field.get('name') or '') + len(field.get('value') or '')
+    return length
+
+
+def _retry_after(response: requests.Response) -> float:
+    """Seconds Discord asks us to wait, from headers or the 429 body"""
+    for header in ('Retry-After', 'X-RateLimit-Reset-After'):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+    try:
+        return float(response.json().get('retry_after', 1.0))
+    except Exception:
+        return 1.0
+
+
+class DiscordNotifier:
+    """
+    Outbound queue for Discord webhook alerts.
+    Embeds are grouped by (user, webhook URL) and packed up to 10 (and 6000 characters) per message;
+    each webhook is delivered in order while different webhooks go out
+    concurrently, honouring 429 Retry-After and the rate-limit bucket headers.
+    When a user has more alerts on a webhook than their digest threshold, `digest_builder`
+    turns their summaries into digest embeds (one per DIGEST_ROWS_PER_EMBED alerts)
+    that are sent instead of the individual ones.
+    With `dry_run` set, messages are logged instead of posted (and count as sent).
+    """
+
+    def __init__(self, max_workers: int = DISCORD_FLUSH_WORKERS, timeout: int = 10,
+                 digest_builder: Callable[[List[Dict]], Dict] = None):
+        self.max_workers = max_workers
+        self.digest_builder = digest_builder
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        # Keyed by (user_id, webhook_url): users sharing a webhook keep their own digest thresholds
+        self._queue: Dict[Tuple[object, str], List[QueuedAlert]] = {}
+        self._digest_thresholds: Dict[Tuple[object, str], int] = {}
+        self.dry_run = False
+
+    def enqueue(self, webhook_url: str, embed: Dict, on_failure: Callable[[], None] = None,
+                summary: Dict = None, digest_threshold: int = None, user_id=None):
+        """
+        Queue an embed. With `summary` and `digest_threshold`, more than
+        `digest_threshold` alerts for this user and webhook in one flush become a digest.
+        """
+        key = (user_id, webhook_url)
+        with self._lock:
+            self._queue.setdefault(key, []).append(QueuedAlert(embed, summary, on_failure))
+            if digest_threshold is not None:
+                self._digest_thresholds[key] = digest_threshold
+
+    def _post(self, webhook_url: str, embeds: List[Dict]) -> bool:
+        if self.dry_run:
+            log.info(f"Dry run: not posting {len(embeds)} embed(s): "
+                     + "; ".join(embed.get('title', '') for embed in embeds))
+            return True
+        for attempt in range(DISCORD_MAX_ATTEMPTS):
+            throttle('discord')
+            try:
+                response = self.session.post(webhook_url, json={'embeds': embeds}, timeout=self.timeout)
+            except Exception as e:
+                log.error(f"Error sending Discord alert: {e}")
+                time.sleep(2 ** attempt)
+                continue
+
+            if response.status_code in [200, 204]:
+                # Bucket exhausted: wait for it to reset before the next message to this webhook
+                if response.headers.get('X-RateLimit-Remaining') == '0':
+                    time.sleep(_retry_after(response))
+                return True
+
+            if response.status_code == 429:
+                wait = _retry_after(response)
+                log.warning(f"Discord rate limited, retrying in {wait:.2f}s")
+                time.sleep(wait)
+                continue
+
+            if response.status_code >= 500:
+                time.sleep(2 ** attempt)
+                continue
+
+            log.error(f"Discord Webhook failed: {response.status_code} - {response.text}")
+            return False
+
+        log.error(f"Discord Webhook failed after {DISCORD_MAX_ATTEMPTS} attempts")
+        return False
+
+    def _messages(self, items: List[QueuedAlert],
+                  digest_threshold: Optional[int]) -> List[Tuple[List[QueuedAlert], List[Dict]]]:
+        """Split one webhook's alerts into messages: (alerts covered, embeds to post)"""
+        if (self.digest_builder and digest_threshold is not None and len(items) > digest_threshold
+                and all(item.summary for item in items)):
+            # Digest embeds stand in for all of the alerts they summarise
+            embeds = [
+                (group, self.digest_builder([item.summary for item in group]))
+                for group in (items[i:i + DIGEST_ROWS_PER_EMBED] for i in range(0, len(items), DIGEST_ROWS_PER_EMBED))
+            ]
+        else:
+            embeds = [([item], item.embed) for item in items]
+
+        # Pack embeds in order until the next one would break the count or text limit
+        messages = []
+        chunk, chars = [], 0
+        for group, embed in embeds:
+            length = embed_length(embed)
+            if chunk and (len(chunk) >= DISCORD_MAX_EMBEDS or chars + length > DISCORD_MAX_EMBED_CHARS):
+                messages.append(([item for g, _ in chunk for item in g], [e for _, e in chunk]))
+                chunk, chars = [], 0
+            chunk.append((group, embed))
+            chars += length
+        if chunk:
+            messages.append(([item for g, _ in chunk for item in g], [e for _, e in chunk]))
+        return messages
+
+    def _deliver(self, webhook_url: str,
+                 batches: List[Tuple[List[QueuedAlert], Optional[int]]]) -> Tuple[int, int]:
+        """Post one webhook's alerts, one (alerts, digest threshold) batch per user, in order"""
+        sent = failed = 0
+        for items, digest_threshold in batches:
+            for alerts, embeds in self._messages(items, digest_threshold):
+                if self._post(webhook_url, embeds):
+                    sent += len(alerts)
+                    continue
+
+                failed += len(alerts)
+                for item in alerts:
+                    if item.on_failure:
+                        item.on_failure()
+        return sent, failed
+
+    def flush(self) -> Tuple[int, int]:
+        """
+        Deliver everything queued so far.
+        Returns: (embeds sent, embeds failed)
+        """
+        with self._lock:
+            queue, self._queue = self._queue, {}
+            thresholds, self._digest_thresholds = self._digest_thresholds, {}
+        if not queue:
+            return 0, 0
+
+        # One delivery per webhook, so users sharing it don't race for its rate-limit bucket
+        webhooks: Dict[str, List[Tuple[List[QueuedAlert], Optional[int]]]] = {}
+        for key, items in queue.items():
+            webhooks.setdefault(key[1], []).append((items, thresholds.get(key)))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='discord') as pool:
+            results = list(pool.map(lambda item: self._deliver(*item), webhooks.items()))
+
+        sent = sum(result[0] for result in results)
+        failed = sum(result[1] for result in results)
+        log.info(f"Discord: {sent} alert(s) sent in batches to {len(webhooks)} webhook(s), {failed} failed")
+        return sent, failed
@@ -0,0 +1,54 @@
+import numpy as np
+from typing import List, NamedTuple
+from positions import Position
+
+
+class PositionArrays:
+    """Active positions as column arrays, in the same order as `positions`"""
+
+    def __init__(self, positions: List[Position]):
+        self.positions = positions
+        count = len(positions)
+        self.buy_price = np.fromiter((p.buy_price for p in positions), dtype=float, count=count)
+        self.profit_target = np.fromiter((p.profit_target for p in positions), dtype=float, count=count)
+        self.loss_target = np.fromiter((p.loss_target for p in positions), dtype=float, count=count)
+        self.cooldown_until = np.fromiter((p.cooldown_until for p in positions), dtype=float, count=count)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def in_cooldown(self, now: float) -> np.ndarray:
+        """Positions still inside their alert cooldown at `now` (epoch seconds)"""
+        return now < self.cooldown_until
+
+
+class Evaluation(NamedTuple):
+    """Per-position results of one vectorized pass (arrays aligned with the positions)"""
+    price: np.ndarray
+    percentage_change: np.ndarray
+    in_cooldown: np.ndarray
+    profit: np.ndarray
+    loss: np.ndarray
+
+    def triggered(self) -> np.ndarray:
+        """Row indices that need alert handling (profit or loss crossed, not in cooldown)"""
+        return np.flatnonzero(self.profit | self.loss)
+
+
+def evaluate(positions: PositionArrays, prices: np.ndarray, now: float) -> Evaluation:
+    """
+    Crossings, percentage changes and cooldown for every position at once.
+    `prices` holds each position's quote (NaN where there is none); `now` is epoch seconds.
+    """
+    atp = positions.buy_price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage_change = (prices - atp) / atp * 100
+
+    in_cooldown = positions.in_cooldown(now)
+    eligible = ~in_cooldown & ~np.isnan(prices)
+
+    # Same precedence as before: a profit crossing wins over a loss crossing
+    profit = eligible & (prices >= positions.profit_target)
+    loss = eligible & ~profit & (prices <= positions.loss_target)
+
+    return Evaluation(prices, percentage_change, in_cooldown, profit, loss)
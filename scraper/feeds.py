@@ -0,0 +1,116 @@
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional
+
+log = logging.getLogger(__name__)
+
+
+class Tick(NamedTuple):
+    """One price update for a symbol"""
+    symbol: str
+    price: float
+    source: Optional[str] = None
+    timestamp: Optional[float] = None
+
+
+class PollingFeed:
+    """
+    Adapter over the polling quote functions.
+    Every `interval` seconds fetches prices for `symbols()` and yields a tick
+    for every price, changed or not: a position added by a reload, or one whose
+    cooldown just ran out, must still alert at a flat price.
+    """
+
+    def __init__(self, symbols: Callable[[], List[str]], fetch: Callable[[List[str]], Dict[str, float]],
+                 interval: float, active: Callable[[], bool] = None, source: str = 'poll'):
+        self.symbols = symbols
+        self.fetch = fetch
+        self.interval = interval
+        self.active = active
+        self.source = source
+
+    async def __aiter__(self) -> AsyncIterator[Tick]:
+        while True:
+            started = time.monotonic()
+            if self.active is None or self.active():
+                symbols = self.symbols()
+                try:
+                    # The fetchers are blocking (requests + rate limiters): keep them off the event loop
+                    prices = await asyncio.to_thread(self.fetch, symbols) if symbols else {}
+                except Exception as e:
+                    log.error(f"Polling feed fetch failed: {e}")
+                    prices = {}
+
+                now = time.time()
+                for symbol, price in prices.items():
+                    if price is not None:
+                        yield Tick(symbol, price, self.source, now)
+
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def parse_tick_line(line: str) -> Optional[Tick]:
+    """A replay line -> Tick (None for blank/comment/unparseable lines)"""
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    try:
+        if line.startswith('{'):
+            row = json.loads(line)
+            ts = row.get('ts')
+            return Tick(row['symbol'], float(row['price']), 'replay', float(ts) if ts is not None else None)
+        parts = [part.strip() for part in line.split(',')]
+        ts = float(parts[2]) if len(parts) > 2 and parts[2] else None
+        return Tick(parts[0], float(parts[1]), 'replay', ts)
+    except (KeyError, IndexError, ValueError) as e:
+        log.warning(f"Skipping bad replay line {line[:80]!r}: {e}")
+        return None
+
+
+class ReplayFeed:
+    """
+    Replays recorded ticks from a file path or a 'tcp://host:port' socket, one per line:
+    JSON ({"symbol": "TCS", "price": 3890.5, "ts": 1718000000.0}) or CSV (TCS,3890.5[,ts]).
+    With `speed` > 0 and timestamps present, the original gaps are reproduced
+    (divided by `speed`); `speed` = 0 replays as fast as possible.
+    """
+
+    def __init__(self, target: str, speed: float = 0.0):
+        self.target = target
+        self.speed = speed
+
+    async def _lines(self) -> AsyncIterator[str]:
+        if self.target.startswith('tcp://'):
+            host, _, port = self.target[len('tcp://'):].rpartition(':')
+            reader, writer = await asyncio.open_connection(host, int(port))
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    yield line.decode('utf-8', errors='replace')
+            finally:
+                writer.close()
+        else:
+            with open(self.target, encoding='utf-8') as f:
+                for line in f:
+                    yield line
+                    # Let the consumer run between lines
+                    await asyncio.sleep(0)
+
+    async def __aiter__(self) -> AsyncIterator[Tick]:
+        previous_ts = None
+        async for line in self._lines():
+            tick = parse_tick_line(line)
+            if tick is None:
+                continue
+            if self.speed > 0 and tick.timestamp is not None and previous_ts is not None:
+                gap = (tick.timestamp - previous_ts) / self.speed
+                if gap > 0:
+                    await asyncio.sleep(gap)
+            if tick.timestamp is not None:
+                previous_ts = tick.timestamp
+            yield tick
+        log.info(f"Replay of {self.target} finished")
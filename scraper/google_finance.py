@@ -0,0 +1,57 @@
+import re
+import html as html_lib
+import logging
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+# The price class on Google Finance is usually "YMlKec fxKbKc"
+PRICE_CLASS = 'YMlKec fxKbKc'
+
+# First <div ... class="YMlKec fxKbKc" ...>₹2,450.00</div> on the page (contents may hold inline tags)
+_PRICE_DIV = re.compile(
+    r'<div\b[^>]*\bclass\s*=\s*["\']' + re.escape(PRICE_CLASS) + r'["\'][^>]*>(.*?)</div\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+_TAG = re.compile(r'<[^>]*>')
+
+
+def _parse_price_text(text: str) -> float:
+    return float(text.replace('₹', '').replace(',', '').strip())
+
+
+def extract_price(html: str) -> Optional[float]:
+    """
+    Pull the quote price out of a Google Finance page without building a DOM.
+    Scans for the first price div and stops there; only falls back to a
+    strained BeautifulSoup parse if the class is present but the markup is unusual.
+    """
+    if PRICE_CLASS not in html:
+        return None
+
+    match = _PRICE_DIV.search(html)
+    if match:
+        # Same text BeautifulSoup would see: tags dropped, entities (&#8377;) decoded
+        text = html_lib.unescape(_TAG.sub('', match.group(1)))
+        try:
+            return _parse_price_text(text)
+        except ValueError:
+            log.debug(f"Google Finance price text {text!r} not parsed, using BeautifulSoup")
+    else:
+        log.debug("Google Finance price div not matched by pattern, using BeautifulSoup")
+    return extract_price_bs4(html, strained=True)
+
+
+def extract_price_bs4(html: str, strained: bool = False) -> Optional[float]:
+    """
+    Reference parser: the original full BeautifulSoup lookup.
+    With `strained`, only price divs are kept in the tree.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    parse_only = SoupStrainer('div', class_=PRICE_CLASS) if strained else None
+    soup = BeautifulSoup(html, 'html.parser', parse_only=parse_only)
+    price_div = soup.find('div', class_=PRICE_CLASS)
+    if price_div:
+        return _parse_price_text(price_div.text)
+    return None
@@ -1,13 +1,36 @@
 import os
+import json
 import time
+import signal
+import asyncio
 import logging
+import argparse
+import threading
 import requests
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from supabase import create_client, Client
-from typing import Optional, Dict, List
-import yfinance as yf
-from bs4 import BeautifulSoup
+from typing import Callable, Optional, Dict, List, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from nse_client import get_nse_client
+from yahoo_client import get_yahoo_client
+from symbol_resolver import search_symbol, CACHE_DIR
+from rate_limiter import throttle
+from providers import ProviderRegistry, ProviderUnavailable, QuoteProvider
+from google_finance import extract_price as extract_google_finance_price
+from quote_cache import Quote, QuoteCache, NO_QUOTE, normalize_symbol
+from write_buffer import WriteBuffer, ID_CHUNK_SIZE
+from discord_notifier import DiscordNotifier
+from positions import Position
+from evaluator import Evaluation, PositionArrays, evaluate
+from trigger_index import TriggerIndex
+from feeds import PollingFeed, ReplayFeed
+from scheduler import PollScheduler
+from stock_loader import StockLoader, StockSync
+from sharding import parse_shard, in_shard
+from quote_store import QUOTE_ALERT_MAX_AGE_SECONDS, RevalidatingQuotes, get_quote_store
+from tick_history import TickHistory
 
 # Load env variables
 load_dotenv()
@@ -28,20 +51,101 @@ if not url or not key:
 
 supabase: Client = create_client(url, key)
 
+# Write-behind buffer: last_price / alert / error_logs writes are flushed in batches
+writes = WriteBuffer(supabase)
+
+# Paged stock loading; stock_sync keeps long-running modes up to date incrementally
+stock_loader = StockLoader(supabase)
+stock_sync = StockSync(stock_loader, parse=lambda row: load_position(row))
+
+# Positions per symbol sorted by trigger price; used (and reloaded) by the streaming modes
+trigger_index = TriggerIndex()
+
+# Streaming: symbols the polling feed only priced through the resolver (normalized key -> resolved
+# symbol), so process_quote can auto-fix them like evaluate_positions does
+resolved_symbols: Dict[str, str] = {}
+
+# Outbound Discord queue, flushed (batched per webhook) at the end of each sweep
+notifier = DiscordNotifier(digest_builder=lambda rows: build_digest_embed(rows))
+
+# (stock_id, alert_type) pairs with an unacknowledged alert, loaded once per run.
+# None means not loaded, and should_send_alert falls back to the per-stock RPC.
+pending_alerts: Optional[Set[Tuple[int, str]]] = None
+
 # Dashboard URL for acknowledgement links
 DASHBOARD_URL = os.environ.get("DASHBOARD_URL", "http://localhost:3000")
 
 # Alert cooldown period in minutes
 ALERT_COOLDOWN_MINUTES = 60
 
+# Adaptive polling (--adaptive): symbols near a target are polled more often
+scheduler = PollScheduler()
+
+# More triggered alerts than this for one user in a run are sent as a single digest
+# (per user: profiles.alert_digest_threshold)
+DIGEST_THRESHOLD = int(os.environ.get("DIGEST_THRESHOLD", "5"))
+
+# Number of stocks processed concurrently; upstreams are throttled by rate_limiter
+SCRAPER_WORKERS = int(os.environ.get("SCRAPER_WORKERS", "8"))
+
+# Daemon mode: seconds between sweeps and the health/heartbeat file it keeps fresh
+POLL_INTERVAL_SECONDS = int(os.environ.get("POLL_INTERVAL_SECONDS", "60"))
+HEARTBEAT_FILE = os.environ.get("HEARTBEAT_FILE", os.path.join(CACHE_DIR, 'heartbeat.json'))
 
-def get_active_stocks() -> List[Dict]:
-    """Fetch all active stocks from database"""
+# NSE cash session in IST, (hour, minute)
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+
+# Hedged quotes: if the first provider hasn't answered within its recent p90 latency,
+# ask the next one in parallel and take whichever valid price arrives first
+HEDGED_QUOTES = os.environ.get("HEDGED_QUOTES", "false").lower() in ('1', 'true', 'yes')
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "90"))
+# Used until a provider has latency samples, and as a floor for the budget
+HEDGE_DEFAULT_DELAY_SECONDS = 2.0
+HEDGE_MIN_DELAY_SECONDS = 0.25
+
+# This process's slice of the watchlist (--shard i/N): positions are split by symbol hash
+SHARD = parse_shard(os.environ.get("SCRAPER_SHARD"))
+
+# NSE indices whose snapshots are pulled once per run to price most symbols in bulk
+NSE_BULK_INDICES = [
+    index.strip() for index in os.environ.get("NSE_BULK_INDICES", "NIFTY 500").split(',')
+    if index.strip()
+]
+
+# Every fetched price, appended to day-partitioned files (see tick_history.py)
+tick_history = TickHistory()
+
+# Last good quote per symbol, kept on disk across runs (see quote_store.py); opened on first use
+stored_quotes: Optional[RevalidatingQuotes] = None
+
+
+def load_position(row: Dict) -> Optional[Position]:
+    """Parse one stocks row (joined with profiles) into a Position; None if it is unusable"""
     try:
-        # Fetch stocks and join with profiles to get their specific webhook
+        return Position.from_row(row, ALERT_COOLDOWN_MINUTES * 60, DIGEST_THRESHOLD)
+    except (KeyError, TypeError, ValueError) as e:
+        log.error(f"Invalid position {row.get('id')} ({row.get('symbol', 'UNKNOWN')}): {e}")
+        return None
+
+
+def get_active_stocks(sync: Optional[StockSync] = None) -> List[Position]:
+    """
+    Fetch all active stocks from database, a page at a time, parsed into Positions.
+    With `sync` (long-running modes), only rows changed since the last call are fetched.
+    With SHARD set, only this shard's symbols are returned.
+    """
+    try:
+        # Stocks are joined with profiles to get their specific webhook (and digest setting)
         # Note: 'profiles' is the table name, so the key in response will be 'profiles'
-        response = supabase.table('stocks').select("*, profiles(discord_webhook)").eq('is_active', True).execute()
-        return response.data
+        if sync is not None:
+            positions = sync.refresh()
+        else:
+            positions = [position for position in map(load_position, stock_loader.iter_stocks()) if position]
+        if SHARD is not None:
+            positions = [position for position in positions if in_shard(position.key, SHARD)]
+        return positions
     except Exception as e:
         log.error(f"Error fetching stocks: {e}")
         return []
@@ -53,41 +157,62 @@ def get_nse_stock_price(symbol: str) -> Optional[float]:
     This is much faster than Selenium scraping
     """
     try:
-        # NSE requires specific headers to prevent blocking
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Referer': 'https://www.nseindia.com/',
-            'X-Requested-With': 'XMLHttpRequest'
-        }
-        
-        # First, get cookies by visiting the homepage
-        session = requests.Session()
-        session.get('https://www.nseindia.com/', headers=headers, timeout=10)
-        time.sleep(0.5)  # Small delay to mimic human behavior
-        
-        # Now fetch the stock data
-        api_url = f'https://www.nseindia.com/api/quote-equity?symbol={symbol}'
-        response = session.get(api_url, headers=headers, timeout=10)
+        # Shared client: cookies are fetched once per run, not once per symbol
+        data = get_nse_client().get_json('/api/quote-equity', {'symbol': symbol})
         
-        if response.status_code == 200:
-            data = response.json()
+        if data:
             # Extract current price (Last Traded Price)
             price = data.get('priceInfo', {}).get('lastPrice')
             if price:
                 log.info(f"NSE API: {symbol} = ₹{price}")
                 return float(price)
-        else:
-            log.warning(f"NSE API returned status {response.status_code} for {symbol}")
             
+    except ProviderUnavailable:
+        raise
+    except requests.RequestException as e:
+        raise ProviderUnavailable(f"NSE request failed: {e}") from e
     except Exception as e:
         log.error(f"Error fetching NSE price for {symbol}: {e}")
     
     return None
 
 
+def get_bulk_nse_prices(symbols: List[str]) -> Dict[str, float]:
+    """
+    Price many symbols at once from NSE index snapshots (one call per index).
+    Symbols not covered by any configured index are left out and
+    should be fetched one by one.
+    Returns: {symbol: price} keyed by the symbols passed in
+    """
+    # NSE keys are plain upper-case tickers, so map our symbols onto that form
+    wanted: Dict[str, List[str]] = {}
+    for symbol in set(symbols):
+        key = normalize_symbol(symbol)
+        if ' ' in key:
+            continue
+        wanted.setdefault(key, []).append(symbol)
+
+    prices: Dict[str, float] = {}
+    found = set()
+    for index in NSE_BULK_INDICES:
+        missing = wanted.keys() - found
+        if not missing:
+            break
+        try:
+            snapshot = get_nse_client().get_index_quotes(index)
+        except Exception as e:
+            log.error(f"Error fetching NSE index snapshot '{index}': {e}")
+            continue
+
+        for key in missing & snapshot.keys():
+            found.add(key)
+            for symbol in wanted[key]:
+                prices[symbol] = snapshot[key]
+
+    log.info(f"NSE bulk snapshot covered {len(found)}/{len(wanted)} symbols")
+    return prices
+
+
 def get_bse_stock_price(symbol: str) -> Optional[float]:
     """
     Fallback: Fetch stock price from BSE (if NSE fails)
@@ -103,6 +228,7 @@ def get_bse_stock_price(symbol: str) -> Optional[float]:
         # Note: BSE might require stock code instead of symbol
         # This is a placeholder - adjust based on actual BSE API
         api_url = f'https://api.bseindia.com/BseIndiaAPI/api/StockReachGraph/w?scripcode={symbol}&flag=0'
+        throttle('bse')
         response = requests.get(api_url, headers=headers, timeout=10)
         
         if response.status_code == 200:
@@ -120,10 +246,6 @@ def get_bse_stock_price(symbol: str) -> Optional[float]:
     return None
 
 
-import yfinance as yf
-
-# ... (previous functions remain the same)
-
 def get_request_session():
     """Create a session with robust headers to avoid blocking"""
     session = requests.Session()
@@ -137,52 +259,71 @@ def get_request_session():
     })
     return session
 
-# ... (imports are at top of file, ensuring BeautifulSoup is imported)
-
-# ... (imports)
-from symbol_resolver import search_symbol
-
-# ... (rest of imports)
-
 def format_symbol_for_yahoo(symbol: str) -> str:
     """Format symbol for Yahoo Finance (e.g., 'Make sure .NS is there')"""
     if symbol.upper().endswith('.NS') or symbol.upper().endswith('.BO'):
         return symbol.upper()
     return f"{symbol}.NS"
 
+def yahoo_candidates(symbol: str) -> List[str]:
+    """
+    Yahoo tickers to try for a symbol:
+    1. As provided formatted for Yahoo
+    2. Spaces removed formatted for Yahoo (if not resolved)
+    """
+    candidates = [format_symbol_for_yahoo(symbol)]
+    if ' ' in symbol:
+        candidates.append(format_symbol_for_yahoo(symbol.replace(' ', '')))
+    return candidates
+
+
 def get_yahoo_stock_price(symbol: str) -> Optional[float]:
     """
     Fallback 2: Fetch stock price from Yahoo Finance
     """
     try:
-        # Try different formats
-        # 1. As provided formatted for Yahoo
-        # 2. Spaces removed formatted for Yahoo (if not resolved)
-        
-        candidates = [format_symbol_for_yahoo(symbol)]
-        if ' ' in symbol:
-             candidates.append(format_symbol_for_yahoo(symbol.replace(' ', '')))
+        candidates = yahoo_candidates(symbol)
+        # All candidate formats in one request
+        prices = get_yahoo_client().get_quotes(candidates)
         
         for ticker_symbol in candidates:
-            try:
-                # Do NOT pass session to yfinance (it handles it internally now)
-                stock = yf.Ticker(ticker_symbol)
-                
-                # Fast fetch using 'history' (period="1d")
-                data = stock.history(period="1d")
-                
-                if not data.empty:
-                    price = data['Close'].iloc[-1]
-                    log.info(f"Yahoo Finance: {ticker_symbol} = ₹{price} (Delayed)")
-                    return float(price)
-            except Exception:
-                continue
+            price = prices.get(ticker_symbol.upper())
+            if price is not None:
+                log.info(f"Yahoo Finance: {ticker_symbol} = ₹{price} (Delayed)")
+                return price
             
+    except ProviderUnavailable:
+        raise
+    except requests.RequestException as e:
+        raise ProviderUnavailable(f"Yahoo request failed: {e}") from e
     except Exception as e:
         log.error(f"Error fetching Yahoo price for {symbol}: {e}")
     
     return None
 
+
+def get_bulk_yahoo_prices(symbols: List[str]) -> Dict[str, float]:
+    """
+    Price many symbols with batched Yahoo quote requests.
+    Returns: {symbol: price} keyed by the symbols passed in
+    """
+    candidates = {symbol: yahoo_candidates(symbol) for symbol in set(symbols)}
+    try:
+        found = get_yahoo_client().get_quotes([c for cands in candidates.values() for c in cands])
+    except Exception as e:
+        log.error(f"Error fetching Yahoo prices in bulk: {e}")
+        return {}
+    
+    prices = {}
+    for symbol, cands in candidates.items():
+        for ticker_symbol in cands:
+            if ticker_symbol.upper() in found:
+                prices[symbol] = found[ticker_symbol.upper()]
+                break
+    
+    log.info(f"Yahoo bulk quotes covered {len(prices)}/{len(candidates)} symbols")
+    return prices
+
 # ... (get_google_finance_price remains same)
 
 def get_google_finance_price(symbol: str) -> Optional[float]:
@@ -195,79 +336,262 @@ def get_google_finance_price(symbol: str) -> Optional[float]:
         url = f"https://www.google.com/finance/quote/{clean_symbol}:NSE"
         
         session = get_request_session()
+        throttle('google')
         response = session.get(url, timeout=10)
         
+        if response.status_code in (403, 429) or response.status_code >= 500:
+            raise ProviderUnavailable(f"Google Finance returned status {response.status_code}")
+        
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # The price class on Google Finance is usually "YMlKec fxKbKc"
-            price_div = soup.find('div', class_='YMlKec fxKbKc')
+            # Targeted scan for the price div, no full DOM build
+            price = extract_google_finance_price(response.text)
             
-            if price_div:
-                price_text = price_div.text.replace('₹', '').replace(',', '').strip()
-                price = float(price_text)
+            if price is not None:
                 log.info(f"Google Finance: {clean_symbol} = ₹{price}")
                 return price
                 
+    except ProviderUnavailable:
+        raise
+    except requests.RequestException as e:
+        raise ProviderUnavailable(f"Google Finance request failed: {e}") from e
     except Exception as e:
         log.error(f"Error fetching Google Finance price for {symbol}: {e}")
     
     return None
 
-def get_stock_price(symbol: str) -> tuple[Optional[float], Optional[str]]:
+# Direct price sources, tried in order of recent health (configured order as tie-break)
+quote_providers = ProviderRegistry()
+quote_providers.register('nse', get_nse_stock_price, accepts=lambda symbol: ' ' not in symbol)
+quote_providers.register('yahoo', get_yahoo_stock_price)
+quote_providers.register('google', get_google_finance_price)
+
+# Threads for hedged requests, created on first use (see get_hedge_pool)
+hedge_pool: Optional[ThreadPoolExecutor] = None
+hedge_pool_size = 0
+hedge_pool_lock = threading.Lock()
+
+
+def get_hedge_pool(workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """
+    The pool hedged requests run on (a quote worker may have a couple in flight).
+    With `workers`, a pool too small for that many quote workers is replaced by a bigger one.
+    """
+    global hedge_pool, hedge_pool_size
+    size = 2 * (workers or SCRAPER_WORKERS) + 4
+    with hedge_pool_lock:
+        previous = hedge_pool
+        if hedge_pool is None or (workers is not None and hedge_pool_size < size):
+            hedge_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix='hedge')
+            hedge_pool_size = size
+        pool = hedge_pool
+    if previous is not None and previous is not pool:
+        # Requests already running on the old pool finish on their own
+        previous.shutdown(wait=False)
+    return pool
+
+
+def try_provider(name: str, symbol: str) -> Optional[float]:
+    """Fetch from one named provider unless its circuit breaker is open"""
+    provider = quote_providers.get(name)
+    if not provider.allow():
+        log.info(f"Skipping {name} for '{symbol}' (circuit open)")
+        return None
+    return provider.call(symbol)
+
+
+def hedge_delay(provider: QuoteProvider) -> float:
+    """How long to wait on `provider` before hedging with the next one"""
+    latency = provider.latency_percentile(HEDGE_PERCENTILE)
+    if latency is None:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    return max(HEDGE_MIN_DELAY_SECONDS, latency)
+
+
+def get_hedged_price(symbol: str, providers: List[QuoteProvider]) -> Optional[Quote]:
+    """
+    Ask providers in order, but start the next one in parallel whenever the
+    current one is slower than its latency budget (or fails). The first valid
+    price wins; slower requests still running are abandoned (their results only
+    feed provider health).
+    """
+    remaining = list(providers)
+    pending = {}
+
+    def launch() -> Optional[QuoteProvider]:
+        while remaining:
+            provider = remaining.pop(0)
+            if provider.allow():
+                pending[get_hedge_pool().submit(provider.call, symbol)] = provider
+                return provider
+            log.info(f"Skipping {provider.name} for '{symbol}' (circuit open)")
+        return None
+
+    latest = launch()
+    while pending:
+        timeout = hedge_delay(latest) if remaining else None
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        if not done:
+            slow = latest
+            latest = launch() or latest
+            if latest is not slow:
+                log.info(f"Hedging '{symbol}': {slow.name} slower than {timeout:.2f}s, also asking {latest.name}")
+            continue
+
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                price = future.result()
+            except Exception as e:
+                log.error(f"Error fetching {provider.name} price for {symbol}: {e}")
+                price = None
+            if price is not None:
+                for other in pending:
+                    other.cancel()
+                return Quote(price, None, provider.name)
+
+        # Everything that finished failed: move on to the next provider right away
+        if not pending:
+            latest = launch() or latest
+
+    return None
+
+
+def get_stock_price(symbol: str) -> Quote:
     """
     Get stock price with multiple fallback mechanisms AND Name Resolution.
-    Returns: (price, resolved_symbol)
+    Providers are tried healthiest first; ones with an open circuit are skipped.
+    Returns: Quote(price, resolved_symbol, source)
     """
-    # 1. Primary: NSE
-    if ' ' not in symbol:
-        price = get_nse_stock_price(symbol)
-        if price is not None:
-            return price, None
+    # 1. Direct providers (NSE, Yahoo, Google by default)
+    providers = []
+    for provider in quote_providers.ordered():
+        if provider.accepts(symbol):
+            providers.append(provider)
+        else:
+            log.warning(f"Symbol '{symbol}' not supported by {provider.name}, skipping direct fetch.")
+
+    if HEDGED_QUOTES:
+        quote = get_hedged_price(symbol, providers)
+        if quote is not None:
+            return quote
     else:
-        log.warning(f"Symbol '{symbol}' has spaces, skipping direct NSE fetch.")
-
-    # 2. Yahoo Finance
-    log.warning(f"Trying Yahoo Finance for '{symbol}'...")
-    price = get_yahoo_stock_price(symbol)
-    if price is not None:
-        return price, None
-
-    # 3. Google Finance
-    log.warning(f"Trying Google Finance for '{symbol}'...")
-    price = get_google_finance_price(symbol)
-    if price is not None:
-        return price, None
-        
-    # 4. RESOLVER FALLBACK
+        for attempt, provider in enumerate(providers):
+            if not provider.allow():
+                log.info(f"Skipping {provider.name} for '{symbol}' (circuit open)")
+                continue
+            if attempt > 0:
+                log.warning(f"Trying {provider.name} for '{symbol}'...")
+
+            price = provider.call(symbol)
+            if price is not None:
+                return Quote(price, None, provider.name)
+
+    # 2. RESOLVER FALLBACK
     log.warning(f"Direct fetches failed for '{symbol}'. Attempting to resolve name to symbol...")
     resolved_symbol = search_symbol(symbol)
-    
+
     if resolved_symbol:
         log.info(f"✨ Resolved '{symbol}' to '{resolved_symbol}'. Retrying fetch...")
-        
+
         # Try Yahoo with the RESOLVED symbol
         # Note: resolved_symbol usually has .NS suffix.
-        price = get_yahoo_stock_price(resolved_symbol)
+        price = try_provider('yahoo', resolved_symbol)
         if price is not None:
-            return price, resolved_symbol
-            
+            return Quote(price, resolved_symbol, 'yahoo')
+
         # Try NSE if resolving gave a .NS symbol
         if resolved_symbol.endswith('.NS'):
             clean_nse = resolved_symbol.replace('.NS', '')
-            price = get_nse_stock_price(clean_nse)
+            price = try_provider('nse', clean_nse)
             if price is not None:
                 # If NSE worked with the clean symbol, we prefer that as the new symbol
-                return price, clean_nse
-                
-    return None, None
+                return Quote(price, clean_nse, 'nse')
+
+    return NO_QUOTE
+
+
+def fetch_stock_price(symbol: str) -> Quote:
+    """get_stock_price, recording the price it finds in the tick history"""
+    quote = get_stock_price(symbol)
+    if quote.price is not None:
+        tick_history.append(symbol, quote.price, quote.source)
+    return quote
+
+
+def get_bulk_prices(fetch: Callable[[List[str]], Dict[str, float]], symbols: List[str], source: str) -> Dict[str, float]:
+    """A bulk fetch whose prices are recorded in the tick history"""
+    prices = fetch(symbols)
+    tick_history.append_many(prices, source)
+    return prices
+
+
+def get_stored_quotes() -> Optional[RevalidatingQuotes]:
+    """Quote fetcher backed by the on-disk quote store (None if the store is unavailable)"""
+    global stored_quotes
+    if stored_quotes is None:
+        store = get_quote_store()
+        if store is not None:
+            # A price from before the previous poll must never decide an alert
+            stored_quotes = RevalidatingQuotes(
+                fetch_stock_price, store,
+                alert_max_age_seconds=min(QUOTE_ALERT_MAX_AGE_SECONDS, POLL_INTERVAL_SECONDS)
+            )
+    return stored_quotes
+
+
+def new_quote_cache(symbols: List[str]) -> QuoteCache:
+    """
+    A run's quote cache, seeded with the bulk NSE snapshot.
+    Other symbols go through the quote store: recent prices skip the network, and
+    a stored price stands in (for last_price only, once too old) when a fetch fails.
+    """
+    revalidating = get_stored_quotes()
+    quotes = QuoteCache(revalidating.get if revalidating is not None else fetch_stock_price)
+    bulk = get_bulk_prices(get_bulk_nse_prices, symbols, 'nse-bulk')
+    quotes.seed(bulk, source='nse-bulk')
+    if revalidating is not None:
+        try:
+            revalidating.store.put_many(bulk, 'nse-bulk')
+        except Exception as e:
+            log.warning(f"Could not store bulk quotes: {e}")
+    return quotes
+
+
+def load_pending_alerts(stock_ids: List[int]) -> Optional[Set[Tuple[int, str]]]:
+    """
+    Fetch every unacknowledged alert for the given stocks up front
+    (one query per chunk of ids instead of one RPC per crossing).
+    Returns None if the lookup fails.
+    """
+    pending = set()
+    try:
+        for i in range(0, len(stock_ids), ID_CHUNK_SIZE):
+            throttle('supabase')
+            response = supabase.table('alerts').select('stock_id, alert_type') \
+                .eq('is_acknowledged', False) \
+                .in_('stock_id', stock_ids[i:i + ID_CHUNK_SIZE]) \
+                .execute()
+            pending.update((row['stock_id'], row['alert_type']) for row in response.data)
+    except Exception as e:
+        log.error(f"Error loading pending alerts, falling back to per-stock checks: {e}")
+        return None
+    
+    log.info(f"Loaded {len(pending)} pending (unacknowledged) alerts")
+    return pending
 
 
 def should_send_alert(stock_id: int, alert_type: str) -> bool:
     """
-    Check if we should send an alert using the database function.
+    Check if we should send an alert.
     Returns True only if there are NO unacknowledged alerts for this stock/type.
+    Uses the run's pending-alert set when loaded, the database function otherwise.
     """
+    if pending_alerts is not None:
+        return (stock_id, alert_type) not in pending_alerts
+    
     try:
+        throttle('supabase')
         response = supabase.rpc('should_send_alert', {
             'p_stock_id': stock_id, 
             'p_alert_type': alert_type
@@ -283,55 +607,49 @@ def should_send_alert(stock_id: int, alert_type: str) -> bool:
 
 def record_alert(stock_id: int, user_id: int, alert_type: str, 
                  current_price: float, threshold_price: float, 
-                 atp_price: float, percentage_change: float) -> Optional[int]:
-    """Record alert in database and return the Alert ID"""
-    try:
-        response = supabase.table('alerts').insert({
-            'stock_id': stock_id,
-            'user_id': user_id,
-            'alert_type': alert_type,
-            'current_price': current_price,
-            'threshold_price': threshold_price,
-            'buy_price': atp_price,
-            'percentage_change': percentage_change,
-            'is_acknowledged': False
-        }).execute()
-        
-        # Update last_alert_sent timestamp on stock
-        supabase.table('stocks').update({
-            'last_alert_sent': datetime.now().isoformat()
-        }).eq('id', stock_id).execute()
-        
-        log.info(f"Alert recorded for stock_id={stock_id}, type={alert_type}")
-        
-        if response.data and len(response.data) > 0:
-            return response.data[0]['id']
-            
-    except Exception as e:
-        log.error(f"Error recording alert: {e}")
+                 atp_price: float, percentage_change: float,
+                 on_failure: Optional[Callable[[], None]] = None):
+    """
+    Queue the alert row; the write buffer updates the stock's last_alert_sent
+    once the row is in, and calls `on_failure` if it can't be inserted.
+    """
+    writes.insert_alert({
+        'stock_id': stock_id,
+        'user_id': user_id,
+        'alert_type': alert_type,
+        'current_price': current_price,
+        'threshold_price': threshold_price,
+        'buy_price': atp_price,
+        'percentage_change': percentage_change,
+        'is_acknowledged': False
+    }, on_failure=on_failure)
     
-    return None
+    # Keep the in-memory view in sync with the row we just queued
+    if pending_alerts is not None:
+        pending_alerts.add((stock_id, alert_type))
+    
+    log.info(f"Alert queued for stock_id={stock_id}, type={alert_type}")
 
 
 def log_alert_error(user_id: int, symbol: str, error_message: str):
-    """Log failed alert attempts to database"""
-    try:
-        supabase.table('error_logs').insert({
-            'user_id': user_id,
-            'stock_symbol': symbol,
-            'error_message': error_message
-        }).execute()
-        log.error(f"Logged error for {symbol} (User {user_id}): {error_message}")
-    except Exception as e:
-        log.error(f"Failed to log error to DB: {e}")
+    """Log failed alert attempts to database (batched by the write buffer)"""
+    writes.insert_error({
+        'user_id': user_id,
+        'stock_symbol': symbol,
+        'error_message': error_message
+    })
+    log.error(f"Logged error for {symbol} (User {user_id}): {error_message}")
 
 
 def send_discord_alert(webhook_url: str, symbol: str, alert_type: str, 
                        current_price: float, atp_price: float, 
                        threshold_price: float, percentage_change: float, 
-                       alert_id: int = None):
+                       alert_id: int = None, on_failure: Callable[[], None] = None,
+                       digest_threshold: int = DIGEST_THRESHOLD, user_id: int = None):
     """
-    Send alert to Discord using Webhook and Rich Embeds
+    Send alert to Discord using Webhook and Rich Embeds.
+    The embed is queued on the notifier; `on_failure` runs if delivery ultimately fails.
+    If the user collects more than `digest_threshold` alerts on this webhook in a run they go out as one digest.
     """
     if not webhook_url:
         log.warning("No Discord Webhook URL provided")
@@ -392,200 +710,538 @@ def send_discord_alert(webhook_url: str, symbol: str, alert_type: str,
             }
         }
         
-        payload = {
-            "embeds": [embed]
+        # Summary row used if this user's alerts get rolled into a digest
+        summary = {
+            'symbol': symbol,
+            'alert_type': alert_type,
+            'current_price': current_price,
+            'threshold_price': threshold_price,
+            'percentage_change': percentage_change
         }
         
-        response = requests.post(webhook_url, json=payload, timeout=10)
-        
-        if response.status_code in [200, 204]:
-            log.info(f"Discord alert sent for {symbol}")
-            return True
-        else:
-            log.error(f"Discord Webhook failed: {response.status_code} - {response.text}")
-            return False
+        # Queued: delivered in batches (up to 10 embeds per message) when the run flushes
+        notifier.enqueue(webhook_url, embed, on_failure,
+                         summary=summary, digest_threshold=digest_threshold, user_id=user_id)
+        log.info(f"Discord alert queued for {symbol}")
+        return True
             
     except Exception as e:
         log.error(f"Error sending Discord alert: {e}")
         return False
 
 
-def process_stock(stock: Dict):
-    """Process a single stock and check for alerts"""
-    stock_id = stock['id']
-    symbol = stock['symbol']
-    atp = float(stock['buy_price'])
-    profit_pct = float(stock['profit_alert_pct'])
-    loss_pct = float(stock['loss_alert_pct'])
-    user_id = stock.get('user_id') 
+def build_digest_embed(rows: List[Dict]) -> Dict:
+    """One compact summary table for many alerts to the same user"""
+    lines = [f"{'Symbol':<12} {'Alert':<6} {'Price':>10} {'Target':>10} {'Change':>8}"]
+    for row in rows:
+        change = row['percentage_change']
+        change_text = f"+{change:.2f}%" if change > 0 else f"{change:.2f}%"
+        lines.append(
+            f"{row['symbol'][:12]:<12} {row['alert_type'].upper():<6} "
+            f"{row['current_price']:>10,.2f} {row['threshold_price']:>10,.2f} {change_text:>8}"
+        )
     
-    # Strict 60-Minute Cooldown Check
-    last_alert_str = stock.get('last_alert_sent')
-    if last_alert_str:
-        try:
-            last_alert = datetime.fromisoformat(last_alert_str.replace('Z', '+00:00'))
-            # If naive (no timezone), assume UTC or strip tz from now()
-            if last_alert.tzinfo is None:
-                last_alert = last_alert.replace(tzinfo=datetime.now().astimezone().tzinfo)
-                
-            time_since_alert = datetime.now(last_alert.tzinfo) - last_alert
-            
-            # 60 minutes = 3600 seconds
-            if time_since_alert.total_seconds() < 3600:
-                log.info(f"⏳ Cooldown: Skipping {symbol} (Last alert {int(time_since_alert.total_seconds()/60)} mins ago)")
-                
-                # Still update current price for dashboard visibility even if skipping alert
-                try: 
-                    # We can fetch price and update even if we don't alert
-                    current_price_check, _ = get_stock_price(symbol)
-                    if current_price_check:
-                         supabase.table('stocks').update({
-                            'last_price': current_price_check
-                        }).eq('id', stock_id).execute()
-                except Exception:
-                    pass
-                return
-        except Exception as e:
-            log.error(f"Error parsing last_alert_sent for {symbol}: {e}")
+    profits = sum(1 for row in rows if row['alert_type'] == 'profit')
+    table = "\n".join(lines)
+    return {
+        "title": f"📊 Alert Digest: {len(rows)} positions triggered",
+        "description": (f"📈 {profits} profit · 📉 {len(rows) - profits} loss\n"
+                        f"```\n{table}\n```\n"
+                        f"[✅ **CLICK HERE TO ACKNOWLEDGE**]({DASHBOARD_URL}/alerts)"),
+        "color": 3447003,  # Blue (#3498DB)
+        "footer": {
+            "text": f"Market Alerts System · {datetime.now().strftime('%I:%M %p IST')}"
+        }
+    }
+
 
-    # Extract webhook from joined profiles data
-    # 'profiles' key comes from the join.
-    user_data = stock.get('profiles')
-    webhook_url = None
-    if user_data and isinstance(user_data, dict):
-        webhook_url = user_data.get('discord_webhook')
+def report_missing_webhook(position: Position):
+    msg = "Missing Discord Webhook URL for user"
+    log.warning(f"{msg}: {position.user_id}")
+    log_alert_error(position.user_id, position.symbol, msg)
+
+
+def fix_symbol(stock_id: int, symbol: str, resolved_symbol: str):
+    """AUTO-FIX: store the symbol the resolver found instead of what the user typed"""
+    if writes.dry_run:
+        log.info(f"Dry run: not fixing symbol '{symbol}' -> '{resolved_symbol}'")
+        return
+    try:
+        log.info(f"🛠️ Auto-Fixing symbol in DB: '{symbol}' -> '{resolved_symbol}'")
+        # If resolved symbol has .NS but user had Name, we save the Ticker.
+        throttle('supabase')
+        supabase.table('stocks').update({
+            'symbol': resolved_symbol
+        }).eq('id', stock_id).execute()
+        log.info("✅ Database updated with correct symbol!")
+    except Exception as e:
+        log.error(f"Failed to update symbol in DB: {e}")
+
+
+def check_position(position: Position, resolved_symbol: Optional[str] = None):
+    """Per-row upkeep for a position that can alert: missing webhook report, symbol auto-fix"""
+    if not position.webhook_url:
+        report_missing_webhook(position)
+    if resolved_symbol and resolved_symbol != position.symbol:
+        fix_symbol(position.id, position.symbol, resolved_symbol)
+
+
+def handle_alert(position: Position, alert_type: str, current_price: float):
+    """
+    A position crossed its profit/loss target: record the alert and queue the Discord message,
+    unless an earlier alert of this type is still waiting for acknowledgement.
+    """
+    symbol = position.symbol
+    user_id = position.user_id
+    atp = position.buy_price
+    target = position.profit_target if alert_type == 'profit' else position.loss_target
+    percentage_change = position.percentage_change(current_price)
+    label = alert_type.capitalize()
     
-    log.info(f"Processing {symbol} (User {user_id})...")
+    # The cooldown was checked by the caller; should_send_alert covers is_acknowledged.
+    if not should_send_alert(position.id, alert_type):
+        log.info(f"{label} alert for {symbol} is pending acknowledgement, skipping...")
+        return
     
-    # Validate Webhook
-    if not webhook_url:
-        msg = "Missing Discord Webhook URL for user"
-        log.warning(f"{msg}: {user_id}")
-        log_alert_error(user_id, symbol, msg)
-        # We continue processing logic but won't send the alert? 
-        # Actually user asked to log issue "if alerts not being sent".
-        # If we skip sending, we should probably stop here or check price anyway but skip send?
-        # Checking price updates 'last_price' which is good. So let's continue but just flag it.
-    
-    # Get current price
-    current_price, resolved_symbol = get_stock_price(symbol)
-    
-    if current_price is None:
-        log.warning(f"Could not fetch price for {symbol}, skipping...")
+    if alert_type == 'profit':
+        msg = (f"PROFIT ALERT: {symbol} reached ₹{current_price:.2f}! "
+               f"(ATP: ₹{atp:.2f}, Target: ₹{target:.2f}, "
+               f"Gain: +{percentage_change:.2f}%)")
+    else:
+        msg = (f"LOSS ALERT: {symbol} dropped to ₹{current_price:.2f}! "
+               f"(ATP: ₹{atp:.2f}, Target: ₹{target:.2f}, "
+               f"Loss: {percentage_change:.2f}%)")
+    log.info(msg)
+    
+    previous_cooldown = position.cooldown_until
+    
+    def forget_alert():
+        # No alert row to acknowledge: don't let the pending set or cooldown hide that
+        if pending_alerts is not None:
+            pending_alerts.discard((position.id, alert_type))
+        position.cooldown_until = previous_cooldown
+        log_alert_error(user_id, symbol, f"Failed to record {label} alert")
+    
+    # 1. Record alert (written in the next batch flush)
+    record_alert(
+        position.id, user_id, alert_type, current_price,
+        target, atp, percentage_change, on_failure=forget_alert
+    )
+    # Long-lived positions (daemon, stream) see the new cooldown before the next reload
+    position.mark_alerted(time.time(), ALERT_COOLDOWN_MINUTES * 60)
+    
+    # 2. Send alert (Only if webhook exists)
+    if position.webhook_url:
+        error_message = f"Failed to send {label} Alert (Discord API Error)"
+        success = send_discord_alert(
+            position.webhook_url, symbol, alert_type, current_price, atp,
+            target, percentage_change,
+            on_failure=lambda: log_alert_error(user_id, symbol, error_message),
+            digest_threshold=position.digest_threshold, user_id=user_id
+        )
+        if not success:
+            log_alert_error(user_id, symbol, error_message)
+    else:
+        log.warning(f"Skipping {label} Alert for {symbol} due to missing webhook")
+
+
+def fetch_quotes(quotes: QuoteCache, symbols: List[str], workers: int = SCRAPER_WORKERS):
+    """Make sure every symbol has a cached quote (one fetch per distinct symbol)"""
+    missing: Dict[str, str] = {}
+    for symbol in symbols:
+        if quotes.peek(symbol) is None:
+            missing.setdefault(normalize_symbol(symbol), symbol)
+    if not missing:
         return
+    
+    log.info(f"Fetching {len(missing)} quote(s) with {workers} worker(s)")
+    if HEDGED_QUOTES:
+        get_hedge_pool(workers)
+    if workers <= 1:
+        for symbol in missing.values():
+            quotes.get(symbol)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quote') as pool:
+            list(pool.map(quotes.get, missing.values()))
 
-    # AUTO-FIX: Update symbol in database if resolved
-    if resolved_symbol and resolved_symbol != symbol:
+
+def evaluate_positions(positions: List[Position], quotes: QuoteCache,
+                       arrays: Optional[PositionArrays] = None) -> Evaluation:
+    """
+    Evaluate all positions against the run's quotes in one NumPy pass, then do the
+    per-row work (alerts, symbol fixes, last_price) only where it is needed.
+    Only already-cached quotes are used; positions without one count as unpriced.
+    Stale quotes (fallbacks past the alert max-age) update last_price but never alert.
+    """
+    arrays = arrays or PositionArrays(positions)
+    cached = [quotes.peek(position.key) or NO_QUOTE for position in positions]
+    prices = np.array([np.nan if quote.price is None else quote.price for quote in cached], dtype=float)
+    stale = np.fromiter((quote.stale for quote in cached), dtype=bool, count=len(cached))
+    
+    result = evaluate(arrays, np.where(stale, np.nan, prices), time.time())
+    
+    active = ~result.in_cooldown
+    for i in np.flatnonzero(active):
+        check_position(positions[i], cached[i].resolved_symbol)
+    
+    for i in result.triggered():
+        position = positions[i]
         try:
-            log.info(f"🛠️ Auto-Fixing symbol in DB: '{symbol}' -> '{resolved_symbol}'")
-            # If resolved symbol has .NS but user had Name, we save the Ticker.
-            supabase.table('stocks').update({
-                'symbol': resolved_symbol
-            }).eq('id', stock_id).execute()
-            log.info("✅ Database updated with correct symbol!")
+            handle_alert(position, 'profit' if result.profit[i] else 'loss', float(prices[i]))
         except Exception as e:
-            log.error(f"Failed to update symbol in DB: {e}")
-    
-    # Calculate thresholds
-    profit_target = atp * (1 + profit_pct / 100)
-    loss_target = atp * (1 - loss_pct / 100)
-    
-    log.info(f"{symbol}: Current=₹{current_price:.2f}, ATP=₹{atp:.2f}, "
-             f"PTarget=₹{profit_target:.2f}, LTarget=₹{loss_target:.2f}")
-    
-    # Check for profit alert
-    if current_price >= profit_target:
-        # We already did strict time check above, so strict check here is redundant but safe.
-        # But we also rely on should_send_alert DB function which checks is_acknowledged.
-        # Let's keep both layers for now.
-        if should_send_alert(stock_id, 'profit'):
-            percentage_change = ((current_price - atp) / atp) * 100
-            msg = (f"PROFIT ALERT: {symbol} reached ₹{current_price:.2f}! "
-                   f"(ATP: ₹{atp:.2f}, Target: ₹{profit_target:.2f}, "
-                   f"Gain: +{percentage_change:.2f}%)")
-            log.info(msg)
-            
-            # 1. Record alert first a get ID
-            new_alert_id = record_alert(
-                stock_id, user_id, 'profit', current_price,
-                profit_target, atp, percentage_change
-            )
-            
-            # 2. Send alert with the ID (Only if webhook exists)
-            if webhook_url:
-                success = send_discord_alert(
-                    webhook_url, symbol, 'profit', current_price, atp, 
-                    profit_target, percentage_change, new_alert_id
-                )
-                if not success:
-                    log_alert_error(user_id, symbol, "Failed to send Profit Alert (Discord API Error)")
-            else:
-                log.warning(f"Skipping Profit Alert for {symbol} due to missing webhook")
+            log.error(f"Error processing stock {position.symbol}: {e}")
+    
+    # Update last_price in database (batched), cooldown positions included for dashboard visibility
+    for i in np.flatnonzero(~np.isnan(prices)):
+        writes.update_last_price(positions[i].id, float(prices[i]))
+    
+    unpriced = active & np.isnan(prices)
+    for i in np.flatnonzero(unpriced):
+        log.warning(f"Could not fetch price for {positions[i].symbol}, skipping...")
+    for i in np.flatnonzero(active & stale):
+        log.warning(f"Only a stale price for {positions[i].symbol}, not checking alerts")
+    
+    log.info(f"Evaluated {len(positions)} positions: {int(result.profit.sum())} profit, "
+             f"{int(result.loss.sum())} loss, {int(result.in_cooldown.sum())} in cooldown, "
+             f"{int(unpriced.sum())} without a price, {int((active & stale).sum())} stale")
+    return result
+
+
+def process_quote(symbol: str, price: float, index: Optional[TriggerIndex] = None) -> int:
+    """
+    Evaluate one new price for a symbol using the trigger index: only the positions
+    whose targets it crosses are looked at (bisect), instead of every holder.
+    Positions out of cooldown get the same upkeep as in evaluate_positions.
+    Returns the number of positions that went through alert handling.
+    """
+    index = index or trigger_index
+    now = time.time()
+    resolved_symbol = resolved_symbols.get(normalize_symbol(symbol))
+    for position in index.positions(symbol):
+        if not position.in_cooldown(now):
+            check_position(position, resolved_symbol)
+    
+    profit_positions, loss_positions = index.crossed(symbol, price)
+    handled = 0
+    for alert_type, crossed in (('profit', profit_positions), ('loss', loss_positions)):
+        for position in crossed:
+            if position.in_cooldown(now):
+                continue
+            try:
+                handle_alert(position, alert_type, price)
+                handled += 1
+            except Exception as e:
+                log.error(f"Error processing stock {position.symbol}: {e}")
+    
+    for position in index.positions(symbol):
+        writes.update_last_price(position.id, price)
+    return handled
+
 
+def run_once(workers: int = SCRAPER_WORKERS, poll_scheduler: Optional[PollScheduler] = None,
+             sync: Optional[StockSync] = None) -> Dict:
+    """
+    One full sweep: load positions, fetch quotes, evaluate and alert, flush writes.
+    With `sync`, positions are refreshed incrementally instead of reloaded.
+    With `poll_scheduler`, only the symbols it says are due are polled and evaluated.
+    Returns a small summary of the run.
+    """
+    global pending_alerts
+    
+    positions = get_active_stocks(sync)
+    log.info(f"Found {len(positions)} active stocks to monitor")
+    
+    if not positions:
+        log.warning("No active stocks found!")
+        return {'positions': 0}
+    
+    if poll_scheduler is not None:
+        poll_scheduler.update_positions(positions)
+        due = poll_scheduler.due()
+        due_keys = {normalize_symbol(symbol) for symbol in due}
+        positions = [position for position in positions if position.key in due_keys]
+        log.info(f"Adaptive polling: {len(due)} of {len(poll_scheduler)} symbol(s) due")
+        if not positions:
+            writes.flush()
+            return {'positions': 0, 'due_symbols': 0}
+    
+    quotes: Optional[QuoteCache] = None
+    try:
+        # One query for all unacknowledged alerts instead of an RPC per crossing
+        pending_alerts = load_pending_alerts([position.id for position in positions])
+        
+        revalidating = get_stored_quotes()
+        store_counts = (revalidating.fresh_hits, revalidating.stale_served) if revalidating else (0, 0)
+        
+        # Bulk quote stage: one call per index instead of one per position
+        quotes = new_quote_cache([position.symbol for position in positions])
+        
+        # If Yahoo currently leads the provider chain (NSE degraded or blocked),
+        # price the rest in a few batched Yahoo requests instead of one per symbol
+        if quote_providers.ordered()[0].name == 'yahoo':
+            uncovered = [position.symbol for position in positions if quotes.peek(position.key) is None]
+            if uncovered:
+                quotes.seed(get_bulk_prices(get_bulk_yahoo_prices, uncovered, 'yahoo-bulk'), source='yahoo-bulk')
+        
+        # Positions in cooldown can't alert: they only refresh last_price from the snapshot,
+        # so a symbol held only by them never costs a dedicated provider-chain fetch
+        arrays = PositionArrays(positions)
+        cooldown = arrays.in_cooldown(time.time())
+        for i in np.flatnonzero(cooldown):
+            quotes.get_cached(positions[i].key)
+        
+        # Quote stage: each upstream is paced by its own rate limiter, so symbols are fetched in parallel
+        fetch_quotes(quotes, [positions[i].symbol for i in np.flatnonzero(~cooldown)], workers)
+        
+        # Decision stage: one vectorized pass over every position
+        evaluate_positions(positions, quotes, arrays)
+    finally:
+        # Every symbol handed out by due() must be rescheduled, even if this sweep failed
+        if poll_scheduler is not None:
+            for symbol in due:
+                quote = quotes.peek(symbol) if quotes is not None else None
+                poll_scheduler.record(symbol, quote.price if quote and not quote.stale else None)
+    
+    # Deliver queued Discord alerts first: failures are logged through the write buffer
+    notifier.flush()
+    
+    # Write whatever is still buffered (last_price, alerts, error_logs)
+    writes.flush()
+    tick_history.flush()
+    
+    log.info(f"Quote cache: {quotes.fetches} individual fetches, {quotes.hits} positions served from cache, "
+             f"{quotes.fetches_saved} fetch(es) skipped for symbols only in cooldown")
+    log.info("Providers: " + ", ".join(
+        f"{p.name}={p.state} ({p.health():.0%} ok)" for p in quote_providers.ordered()
+    ))
+    summary = {'positions': len(positions), 'fetches': quotes.fetches, 'cache_hits': quotes.hits,
+               'fetches_saved': quotes.fetches_saved}
+    if revalidating is not None:
+        summary['store_fresh'] = revalidating.fresh_hits - store_counts[0]
+        summary['store_stale'] = revalidating.stale_served - store_counts[1]
+        log.info(f"Quote store: {summary['store_fresh']} served fresh, "
+                 f"{summary['store_stale']} stored price(s) used after a failed fetch")
+    if poll_scheduler is not None:
+        summary['due_symbols'] = len(due)
+    return summary
+
+
+def is_market_open(now: Optional[datetime] = None) -> bool:
+    """True during the NSE cash session (Mon-Fri, 9:15 AM - 3:30 PM IST)"""
+    now = (now or datetime.now(timezone.utc)).astimezone(IST)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= (now.hour, now.minute) < MARKET_CLOSE
+
+
+def write_heartbeat(path: str, **fields):
+    """Atomically write the daemon's health/heartbeat file"""
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'pid': os.getpid(), 'time': datetime.now(timezone.utc).isoformat(), **fields}, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        log.warning(f"Could not write heartbeat file {path}: {e}")
+
+
+def run_daemon(workers: int = SCRAPER_WORKERS, interval: int = POLL_INTERVAL_SECONDS,
+               heartbeat_file: str = HEARTBEAT_FILE, market_hours_only: bool = True,
+               adaptive: bool = False):
+    """
+    Keep the process (NSE session, connection pools, caches) alive and poll every
+    `interval` seconds. SIGTERM/SIGINT finish the current sweep, flush and exit.
+    With `adaptive`, each sweep only polls the symbols the scheduler says are due.
+    """
+    stop = threading.Event()
+    
+    def handle_signal(signum, frame):
+        log.info(f"Received signal {signum}, shutting down after the current sweep...")
+        stop.set()
+    
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    
+    log.info(f"Daemon started (interval={interval}s, heartbeat={heartbeat_file})")
+    cycles = 0
+    while not stop.is_set():
+        started = time.monotonic()
+        summary: Dict = {}
+        
+        if market_hours_only and not is_market_open():
+            status = 'market-closed'
         else:
-            log.info(f"Profit alert for {symbol} is pending acknowledgement, skipping...")
-    
-    # Check for loss alert
-    elif current_price <= loss_target:
-        if should_send_alert(stock_id, 'loss'):
-            percentage_change = ((current_price - atp) / atp) * 100
-            msg = (f"LOSS ALERT: {symbol} dropped to ₹{current_price:.2f}! "
-                   f"(ATP: ₹{atp:.2f}, Target: ₹{loss_target:.2f}, "
-                   f"Loss: {percentage_change:.2f}%)")
-            log.info(msg)
-            
-            # 1. Record alert first to get ID
-            new_alert_id = record_alert(
-                stock_id, user_id, 'loss', current_price,
-                loss_target, atp, percentage_change
-            )
+            try:
+                summary = run_once(workers, poll_scheduler=scheduler if adaptive else None, sync=stock_sync)
+                cycles += 1
+                status = 'ok'
+            except Exception as e:
+                log.error(f"Sweep failed: {e}")
+                status = 'error'
+        
+        elapsed = time.monotonic() - started
+        write_heartbeat(heartbeat_file, status=status, cycles=cycles,
+                        last_sweep_seconds=round(elapsed, 2), **summary)
+        stop.wait(max(0.0, interval - elapsed))
+    
+    writes.flush()
+    write_heartbeat(heartbeat_file, status='stopped', cycles=cycles)
+    log.info("Daemon stopped")
 
-            # 2. Send alert with the ID (Only if webhook exists)
-            if webhook_url:
-                success = send_discord_alert(
-                    webhook_url, symbol, 'loss', current_price, atp,
-                    loss_target, percentage_change, new_alert_id
-                )
-                if not success:
-                    log_alert_error(user_id, symbol, "Failed to send Loss Alert (Discord API Error)")
-            else:
-                log.warning(f"Skipping Loss Alert for {symbol} due to missing webhook")
+
+def poll_quotes(symbols: List[str], workers: int = SCRAPER_WORKERS) -> Dict[str, float]:
+    """Polling-feed fetcher: bulk NSE snapshot first, then per-symbol providers for the rest"""
+    quotes = new_quote_cache(symbols)
+    fetch_quotes(quotes, symbols, workers)
+    prices = {}
+    for symbol in symbols:
+        quote = quotes.peek(symbol)
+        if quote is not None and quote.resolved_symbol:
+            resolved_symbols[normalize_symbol(symbol)] = quote.resolved_symbol
         else:
-            log.info(f"Loss alert for {symbol} is pending acknowledgement, skipping...")
+            resolved_symbols.pop(normalize_symbol(symbol), None)
+        # Stale fallbacks are not new prices: they must not reach alert evaluation
+        if quote is not None and quote.price is not None and not quote.stale:
+            prices[symbol] = quote.price
+    return prices
+
+
+def reload_positions(index: TriggerIndex, poll_scheduler: Optional[PollScheduler] = None):
+    """Refresh the trigger index (and scheduler) and the pending-alert set from the database"""
+    global pending_alerts
+    positions = get_active_stocks(stock_sync)
+    added, updated, removed = index.sync(positions)
+    if poll_scheduler is not None:
+        poll_scheduler.update_positions(positions)
+    pending_alerts = load_pending_alerts([position.id for position in positions])
+    log.info(f"Trigger index: {len(index)} positions (+{added}, ~{updated}, -{removed})")
+
+
+def flush_alerts():
+    """Deliver queued Discord alerts, then write the buffered rows and ticks"""
+    notifier.flush()
+    writes.flush()
+    tick_history.flush()
+
+
+def poll_scheduled_quotes(symbols: List[str], workers: int = SCRAPER_WORKERS) -> Dict[str, float]:
+    """poll_quotes for the adaptive feed: results go back to the scheduler"""
+    prices: Dict[str, float] = {}
+    try:
+        prices = poll_quotes(symbols, workers)
+    finally:
+        # Symbols handed out by due() stay unscheduled until recorded, failed poll or not
+        for symbol in symbols:
+            scheduler.record(symbol, prices.get(symbol))
+    return prices
+
+
+async def run_stream(feed, reload_interval: int = POLL_INTERVAL_SECONDS,
+                     heartbeat_file: str = HEARTBEAT_FILE, poll_scheduler: Optional[PollScheduler] = None):
+    """
+    Streaming mode: evaluate every tick from `feed` as it arrives (trigger index,
+    cooldown and pending checks as in evaluate_positions) and deliver its alerts right away.
+    Positions are reloaded every `reload_interval` seconds; SIGTERM/SIGINT stop the stream.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
     
-    else:
-        log.info(f"{symbol} is within normal range")
+    await asyncio.to_thread(reload_positions, trigger_index, poll_scheduler)
+    
+    async def reload_periodically():
+        while True:
+            await asyncio.sleep(reload_interval)
+            try:
+                await asyncio.to_thread(reload_positions, trigger_index, poll_scheduler)
+                await asyncio.to_thread(writes.flush)
+                await asyncio.to_thread(tick_history.flush)
+            except Exception as e:
+                log.error(f"Reloading positions failed: {e}")
+            write_heartbeat(heartbeat_file, status='streaming', ticks=ticks, alerts=alerts)
+    
+    async def consume():
+        nonlocal ticks, alerts
+        async for tick in feed:
+            ticks += 1
+            handled = process_quote(tick.symbol, tick.price)
+            if handled:
+                alerts += handled
+                # Don't hold alerts back until the next reload: that is the point of streaming
+                await asyncio.to_thread(flush_alerts)
     
-    # Update last_price in database
+    ticks = alerts = 0
+    log.info(f"Streaming started ({type(feed).__name__}, {len(trigger_index)} positions)")
+    reloader = asyncio.create_task(reload_periodically())
+    consumer = asyncio.create_task(consume())
+    stopper = asyncio.create_task(stop.wait())
     try:
-        supabase.table('stocks').update({
-            'last_price': current_price
-        }).eq('id', stock_id).execute()
-    except Exception as e:
-        log.warning(f"Could not update last_price for {symbol} (Column might be missing): {e}")
+        await asyncio.wait({consumer, stopper}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (reloader, consumer, stopper):
+            task.cancel()
+        if consumer.done() and not consumer.cancelled() and consumer.exception():
+            log.error(f"Feed failed: {consumer.exception()}")
+        flush_alerts()
+        write_heartbeat(heartbeat_file, status='stopped', ticks=ticks, alerts=alerts)
+        log.info(f"Streaming stopped after {ticks} tick(s), {alerts} alert(s)")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Market Alerts scraper")
+    parser.add_argument('--workers', type=int, default=SCRAPER_WORKERS,
+                        help="Number of stocks processed concurrently (1 = sequential)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running and poll every --interval seconds instead of a single sweep")
+    parser.add_argument('--interval', type=int, default=POLL_INTERVAL_SECONDS,
+                        help="Seconds between sweeps in daemon mode")
+    parser.add_argument('--heartbeat-file', default=HEARTBEAT_FILE,
+                        help="Health/heartbeat JSON file updated after every daemon sweep")
+    parser.add_argument('--all-hours', action='store_true',
+                        help="In daemon mode, also poll outside NSE market hours")
+    parser.add_argument('--hedge', action='store_true', default=HEDGED_QUOTES,
+                        help="Hedge slow quote requests with a parallel request to the next provider")
+    parser.add_argument('--stream', action='store_true',
+                        help="Evaluate each price as it arrives instead of in sweeps (polls every --interval seconds)")
+    parser.add_argument('--replay', metavar='PATH_OR_TCP',
+                        help="Stream ticks from a file or tcp://host:port instead of polling (JSON or CSV lines)")
+    parser.add_argument('--replay-speed', type=float, default=0.0,
+                        help="Replay at N x the recorded tick timing (0 = as fast as possible)")
+    parser.add_argument('--replay-live', action='store_true',
+                        help="Let --replay write to the database and post to Discord (it is a dry run by default)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="With --daemon/--stream, poll symbols close to a target more often than distant ones")
+    parser.add_argument('--shard', default=os.environ.get("SCRAPER_SHARD"), metavar='I/N',
+                        help="Only process shard I of N (0-based); positions are split by symbol")
+    parser.add_argument('--summary-json', metavar='PATH',
+                        help="Write the run summary to this file (merge shards with scraper/sharding.py)")
+    return parser.parse_args(argv)
+
+
+def write_summary(path: str, summary: Dict):
+    """Run summary for the shard merge step (scraper/sharding.py)"""
+    if SHARD is not None:
+        summary = {**summary, 'shard': SHARD[0], 'shard_count': SHARD[1]}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(summary, f)
 
 
-def main():
+def main(workers: int = SCRAPER_WORKERS, summary_file: Optional[str] = None):
     log.info("=" * 60)
     log.info("Starting Market Alerts Job")
     log.info(f"Time: {datetime.now().strftime('%Y-%m-%d %I:%M:%S %p IST')}")
+    if SHARD is not None:
+        log.info(f"Shard {SHARD[0]}/{SHARD[1]}")
     log.info("=" * 60)
     
-    stocks = get_active_stocks()
-    log.info(f"Found {len(stocks)} active stocks to monitor")
-    
-    if not stocks:
-        log.warning("No active stocks found!")
-        return
-    
-    for stock in stocks:
-        try:
-            process_stock(stock)
-            # Small delay between stocks to avoid rate limiting
-            time.sleep(1)
-        except Exception as e:
-            log.error(f"Error processing stock {stock.get('symbol', 'UNKNOWN')}: {e}")
-            continue
+    started = time.monotonic()
+    summary = run_once(workers)
+    tick_history.flush()
+    if summary_file:
+        write_summary(summary_file, {**summary, 'elapsed_seconds': round(time.monotonic() - started, 2)})
     
     log.info("=" * 60)
     log.info("Market Alerts Job Completed")
@@ -593,4 +1249,38 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    HEDGED_QUOTES = args.hedge
+    POLL_INTERVAL_SECONDS = args.interval
+    SHARD = parse_shard(args.shard)
+    if args.replay:
+        if not args.replay_live:
+            # Replayed prices are not live: keep them out of the database and Discord
+            writes.dry_run = notifier.dry_run = True
+            log.info("Replay is a dry run (no database writes, no Discord posts); --replay-live to disable")
+        asyncio.run(run_stream(ReplayFeed(args.replay, speed=args.replay_speed),
+                               reload_interval=args.interval, heartbeat_file=args.heartbeat_file))
+    elif args.stream and args.adaptive:
+        # Check the schedule every second; each symbol is polled only when it is due
+        feed = PollingFeed(
+            scheduler.due,
+            lambda symbols: poll_scheduled_quotes(symbols, args.workers),
+            interval=1,
+            active=None if args.all_hours else is_market_open
+        )
+        asyncio.run(run_stream(feed, reload_interval=args.interval, heartbeat_file=args.heartbeat_file,
+                               poll_scheduler=scheduler))
+    elif args.stream:
+        feed = PollingFeed(
+            trigger_index.symbols,
+            lambda symbols: poll_quotes(symbols, args.workers),
+            interval=args.interval,
+            active=None if args.all_hours else is_market_open
+        )
+        asyncio.run(run_stream(feed, reload_interval=args.interval, heartbeat_file=args.heartbeat_file))
+    elif args.daemon:
+        run_daemon(workers=args.workers, interval=args.interval,
+                   heartbeat_file=args.heartbeat_file, market_hours_only=not args.all_hours,
+                   adaptive=args.adaptive)
+    else:
+        main(workers=args.workers, summary_file=args.summary_json)
@@ -0,0 +1,153 @@
+import os
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict
+from rate_limiter import throttle
+from providers import ProviderUnavailable
+
+log = logging.getLogger(__name__)
+
+NSE_BASE_URL = 'https://www.nseindia.com'
+
+# NSE requires specific headers to prevent blocking
+NSE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Referer': 'https://www.nseindia.com/',
+    'X-Requested-With': 'XMLHttpRequest'
+}
+
+# NSE session cookies go stale after a few minutes, refresh them a little before that
+COOKIE_TTL_SECONDS = int(os.environ.get("NSE_COOKIE_TTL_SECONDS", "240"))
+
+
+class NSEClient:
+    """
+    Shared NSE session for a whole run.
+    Gets cookies from the homepage once, keeps keep-alive connections pooled,
+    and refreshes cookies when they age out or NSE answers 401/403.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: int = 10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(NSE_HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._warmed_at: Optional[float] = None
+        # Bumped on every successful warm-up so concurrent 401s refresh only once
+        self._generation = 0
+        self._refreshing = False
+
+    def warm_up(self) -> bool:
+        """Visit the NSE homepage to (re)load session cookies"""
+        try:
+            throttle('nse')
+            self.session.get(f'{NSE_BASE_URL}/', timeout=self.timeout)
+            self._warmed_at = time.monotonic()
+            self._generation += 1
+            log.info("NSE session cookies refreshed")
+            return True
+        except Exception as e:
+            log.error(f"Error warming up NSE session: {e}")
+            return False
+
+    def _refresh(self, seen_generation: int):
+        """Re-warm cookies unless another caller already did since `seen_generation`"""
+        with self._lock:
+            if self._generation == seen_generation:
+                self.warm_up()
+
+    def _refresh_in_background(self):
+        def worker():
+            try:
+                self._refresh(self._generation)
+            finally:
+                self._refreshing = False
+
+        self._refreshing = True
+        threading.Thread(target=worker, name='nse-cookie-refresh', daemon=True).start()
+
+    def _ensure_warm(self):
+        if self._warmed_at is None:
+            self._refresh(0)
+        elif (time.monotonic() - self._warmed_at > COOKIE_TTL_SECONDS
+              and not self._refreshing):
+            # Keep serving with the current cookies while new ones are fetched
+            self._refresh_in_background()
+
+    def get_json(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        GET an NSE API path and return the decoded JSON.
+        Retries once with fresh cookies if NSE rejects the session.
+        Raises ProviderUnavailable if NSE is down or keeps rejecting us;
+        other statuses (e.g. 404 for an unknown symbol) return None.
+        """
+        self._ensure_warm()
+        url = f'{NSE_BASE_URL}{path}'
+
+        for attempt in range(2):
+            generation = self._generation
+            throttle('nse')
+            response = self.session.get(url, params=params, timeout=self.timeout)
+
+            if response.status_code == 200:
+                return response.json()
+
+            if response.status_code in (401, 403) and attempt == 0:
+                log.warning(f"NSE API returned {response.status_code}, refreshing cookies...")
+                self._refresh(generation)
+                continue
+
+            if response.status_code in (401, 403, 429) or response.status_code >= 500:
+                raise ProviderUnavailable(f"NSE API returned status {response.status_code}")
+
+            log.warning(f"NSE API returned status {response.status_code} for {path} {params or ''}")
+            break
+
+        return None
+
+    def get_index_quotes(self, index: str) -> Dict[str, float]:
+        """
+        Fetch last traded prices for every constituent of an NSE index in one call.
+        Returns: {symbol: price}
+        """
+        data = self.get_json('/api/equity-stockIndices', {'index': index})
+        prices = {}
+        if not data:
+            return prices
+
+        for row in data.get('data', []):
+            symbol = row.get('symbol')
+            price = row.get('lastPrice')
+            # The first row is the index itself, not a stock
+            if not symbol or price in (None, '') or symbol == index:
+                continue
+            try:
+                prices[symbol.upper()] = float(str(price).replace(',', ''))
+            except ValueError:
+                continue
+
+        log.info(f"NSE index snapshot '{index}': {len(prices)} prices")
+        return prices
+
+
+_client: Optional[NSEClient] = None
+_client_lock = threading.Lock()
+
+
+def get_nse_client() -> NSEClient:
+    """Return the process-wide NSE client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = NSEClient()
+    return _client
@@ -0,0 +1,87 @@
+import sys
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from quote_cache import normalize_symbol
+
+log = logging.getLogger(__name__)
+
+
+def parse_alert_time(value: Optional[str]) -> Optional[float]:
+    """
+    last_alert_sent -> epoch seconds (None if missing or unparseable).
+    Naive timestamps are taken as local time, like the original cooldown check.
+    """
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (TypeError, ValueError) as e:
+        log.error(f"Error parsing last_alert_sent '{value}': {e}")
+        return None
+
+
+def _digest_threshold(profile: Dict, default: int) -> int:
+    value = profile.get('alert_digest_threshold')
+    if value is not None:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            pass
+    return default
+
+
+class Position:
+    """
+    One active stock position, parsed once when it is loaded: numbers as floats,
+    target prices and the cooldown deadline precomputed, the owner's webhook and
+    digest setting pulled out of the joined profile. Symbols are interned.
+    """
+    __slots__ = ('id', 'user_id', 'symbol', 'key', 'buy_price', 'profit_pct', 'loss_pct',
+                 'profit_target', 'loss_target', 'cooldown_until', 'webhook_url', 'digest_threshold')
+
+    def __init__(self, id, user_id, symbol: str, buy_price: float, profit_pct: float, loss_pct: float,
+                 cooldown_until: float = 0.0, webhook_url: Optional[str] = None, digest_threshold: int = 0):
+        self.id = id
+        self.user_id = user_id
+        self.symbol = sys.intern(symbol)
+        self.key = sys.intern(normalize_symbol(symbol))
+        self.buy_price = buy_price
+        self.profit_pct = profit_pct
+        self.loss_pct = loss_pct
+        self.profit_target = buy_price * (1 + profit_pct / 100)
+        self.loss_target = buy_price * (1 - loss_pct / 100)
+        # Epoch seconds until which no alert is sent (0 = never alerted)
+        self.cooldown_until = cooldown_until
+        self.webhook_url = webhook_url
+        self.digest_threshold = digest_threshold
+
+    @classmethod
+    def from_row(cls, row: Dict, cooldown_seconds: float, default_digest_threshold: int) -> 'Position':
+        """Build from a stocks row joined with profiles; raises KeyError/TypeError/ValueError on bad data"""
+        last_alert = parse_alert_time(row.get('last_alert_sent'))
+        # 'profiles' key comes from the join.
+        profile = row.get('profiles')
+        if not isinstance(profile, dict):
+            profile = {}
+        return cls(
+            row['id'], row.get('user_id'), row['symbol'],
+            float(row['buy_price']), float(row['profit_alert_pct']), float(row['loss_alert_pct']),
+            cooldown_until=last_alert + cooldown_seconds if last_alert is not None else 0.0,
+            webhook_url=profile.get('discord_webhook') or None,
+            digest_threshold=_digest_threshold(profile, default_digest_threshold)
+        )
+
+    def in_cooldown(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+    def mark_alerted(self, now: float, cooldown_seconds: float):
+        """Start the cooldown locally; the database copy is written by the write buffer"""
+        self.cooldown_until = now + cooldown_seconds
+
+    def percentage_change(self, price: float) -> float:
+        return ((price - self.buy_price) / self.buy_price) * 100
+
+    def __repr__(self) -> str:
+        return f"Position(id={self.id!r}, symbol={self.symbol!r})"
+
@@ -0,0 +1,169 @@
+import os
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+log = logging.getLogger(__name__)
+
+# Consecutive failures before a provider's circuit opens
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# Seconds an open circuit waits before letting a single probe request through
+CIRCUIT_OPEN_SECONDS = int(os.environ.get("CIRCUIT_OPEN_SECONDS", "60"))
+
+# Weight of the newest result in the rolling success rate
+SUCCESS_RATE_ALPHA = 0.2
+# Below this success rate a provider is moved behind the healthy ones
+HEALTHY_SUCCESS_RATE = 0.5
+# A demoted provider sees little traffic, so its success rate drifts back towards
+# healthy while idle (time constant in seconds) and it gets retried eventually
+SUCCESS_RATE_RECOVERY_SECONDS = 300
+# Recent latencies kept per provider for percentiles
+LATENCY_WINDOW = 50
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class ProviderUnavailable(Exception):
+    """
+    Raised by a fetch when the upstream itself failed: timeout, connection
+    error, 5xx, or auth still refused after a retry. Only these count against
+    a provider; an answer that simply has no price for the symbol does not.
+    """
+
+
+class QuoteProvider:
+    """
+    A price source plus its recent health.
+    Tracks a rolling success rate and latencies, and a circuit breaker:
+    after `failure_threshold` consecutive failures the circuit opens and the
+    provider is skipped; after `open_seconds` one probe is let through
+    (half-open) and its result closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[str], Optional[float]], priority: int,
+                 accepts: Callable[[str], bool] = None,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 open_seconds: int = CIRCUIT_OPEN_SECONDS):
+        self.name = name
+        self.fetch = fetch
+        self.priority = priority
+        self.accepts = accepts or (lambda symbol: True)
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.success_rate = 1.0
+        self._last_result_at = time.monotonic()
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                log.info(f"Circuit for {self.name} is half-open, sending a probe request")
+                return True
+            return False
+
+    def record(self, success: bool, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.success_rate = self._recovered_rate()
+            self.success_rate += SUCCESS_RATE_ALPHA * ((1.0 if success else 0.0) - self.success_rate)
+            self._last_result_at = time.monotonic()
+
+            if success:
+                if self.state != CLOSED:
+                    log.info(f"Circuit for {self.name} closed again")
+                self.state = CLOSED
+                self.consecutive_failures = 0
+                return
+
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                    self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                log.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} "
+                            f"consecutive failures, skipping it for {self.open_seconds}s")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def _recovered_rate(self) -> float:
+        idle = time.monotonic() - self._last_result_at
+        return 1.0 - (1.0 - self.success_rate) * math.exp(-idle / SUCCESS_RATE_RECOVERY_SECONDS)
+
+    def health(self) -> float:
+        """Rolling success rate, drifted back towards 1.0 for time spent idle"""
+        with self._lock:
+            return self._recovered_rate()
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Recent latency percentile in seconds (None until we have samples)"""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def call(self, symbol: str) -> Optional[float]:
+        """
+        Fetch a price and record the outcome. The provider answering without a
+        price (unknown symbol) is a success; ProviderUnavailable is a failure.
+        """
+        started = time.monotonic()
+        success = False
+        try:
+            price = self.fetch(symbol)
+            success = True
+            return price
+        except ProviderUnavailable as e:
+            log.error(f"{self.name} unavailable for {symbol}: {e}")
+            return None
+        finally:
+            self.record(success, time.monotonic() - started)
+
+
+class ProviderRegistry:
+    """Quote providers ordered by recent health, falling back to their configured priority"""
+
+    def __init__(self):
+        self._providers: List[QuoteProvider] = []
+
+    def register(self, name: str, fetch: Callable[[str], Optional[float]],
+                 accepts: Callable[[str], bool] = None) -> QuoteProvider:
+        provider = QuoteProvider(name, fetch, priority=len(self._providers), accepts=accepts)
+        self._providers.append(provider)
+        return provider
+
+    def get(self, name: str) -> QuoteProvider:
+        for provider in self._providers:
+            if provider.name == name:
+                return provider
+        raise KeyError(name)
+
+    def ordered(self) -> List[QuoteProvider]:
+        """
+        Healthy providers first, in their configured priority; then degraded
+        ones by success rate; providers with an open circuit last.
+        """
+        def sort_key(provider: QuoteProvider):
+            health = provider.health()
+            degraded = health < HEALTHY_SUCCESS_RATE
+            return (provider.state == OPEN, degraded, -health if degraded else 0.0, provider.priority)
+
+        return sorted(self._providers, key=sort_key)
@@ -0,0 +1,110 @@
+import logging
+import threading
+from typing import Callable, Dict, NamedTuple, Optional, Set
+
+log = logging.getLogger(__name__)
+
+
+class Quote(NamedTuple):
+    """
+    A fetched price, the symbol it was resolved to (if any) and where it came from.
+    `stale` prices are too old to decide alerts on (dashboard last_price only).
+    """
+    price: Optional[float]
+    resolved_symbol: Optional[str] = None
+    source: Optional[str] = None
+    stale: bool = False
+
+
+NO_QUOTE = Quote(None)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """Canonical cache key for a symbol: 'reliance.ns ' -> 'RELIANCE'"""
+    key = ' '.join(symbol.split()).upper()
+    if key.endswith('.NS'):
+        key = key[:-3]
+    return key
+
+
+class QuoteCache:
+    """
+    Per-run quote cache keyed by normalized symbol.
+    Concurrent lookups of the same symbol wait on a single in-flight fetch,
+    so every position on that symbol is evaluated against one price.
+    Lookups that only want a price if one is already at hand use get_cached();
+    `fetches_saved` counts the symbols that therefore never needed a fetch.
+    """
+
+    def __init__(self, fetcher: Callable[[str], Quote]):
+        self._fetcher = fetcher
+        self._results: Dict[str, Quote] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._skipped: Set[str] = set()
+        self.fetches = 0
+        self.hits = 0
+
+    def seed(self, prices: Dict[str, float], source: str):
+        """Pre-load prices fetched in bulk (e.g. NSE index snapshots)"""
+        with self._lock:
+            for symbol, price in prices.items():
+                self._results[normalize_symbol(symbol)] = Quote(price, None, source)
+
+    def peek(self, symbol: str) -> Optional[Quote]:
+        """Return the cached result without fetching"""
+        with self._lock:
+            return self._results.get(normalize_symbol(symbol))
+
+    def get_cached(self, symbol: str) -> Optional[Quote]:
+        """Return the cached result, never fetching (e.g. dashboard price for positions in cooldown)"""
+        key = normalize_symbol(symbol)
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+            self._skipped.add(key)
+            return None
+
+    @property
+    def fetches_saved(self) -> int:
+        """Symbols asked for via get_cached() that nobody ended up fetching"""
+        with self._lock:
+            return len(self._skipped.difference(self._results, self._inflight))
+
+    def get(self, symbol: str) -> Quote:
+        """Return the cached quote, fetching it (once) if nobody has yet"""
+        key = normalize_symbol(symbol)
+
+        with self._lock:
+            if key in self._results:
+                self.hits += 1
+                return self._results[key]
+
+            event = self._inflight.get(key)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._inflight[key] = event
+                self.fetches += 1
+            else:
+                self.hits += 1
+
+        if not owner:
+            event.wait()
+            with self._lock:
+                return self._results.get(key, NO_QUOTE)
+
+        result = NO_QUOTE
+        try:
+            result = self._fetcher(symbol)
+        except Exception as e:
+            log.error(f"Error fetching quote for {symbol}: {e}")
+        finally:
+            # Failures are cached too, so waiters and later positions don't refetch
+            with self._lock:
+                self._results[key] = result
+                self._inflight.pop(key, None)
+            event.set()
+
+        return result
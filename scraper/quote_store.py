@@ -0,0 +1,145 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, NamedTuple, Optional
+from quote_cache import Quote, normalize_symbol
+from symbol_resolver import CACHE_DIR
+
+log = logging.getLogger(__name__)
+
+# Quotes younger than this are used without touching the network
+QUOTE_FRESH_SECONDS = float(os.environ.get("QUOTE_FRESH_SECONDS", "20"))
+# Hard limit for alert decisions: an older price never triggers (or suppresses) an alert
+QUOTE_ALERT_MAX_AGE_SECONDS = float(os.environ.get("QUOTE_ALERT_MAX_AGE_SECONDS", "30"))
+# When a fetch fails, a stored price up to this old still updates last_price for the dashboard
+QUOTE_MAX_AGE_SECONDS = float(os.environ.get("QUOTE_MAX_AGE_SECONDS", "300"))
+
+
+class StoredQuote(NamedTuple):
+    price: float
+    source: Optional[str]
+    fetched_at: float
+
+
+class QuoteStore:
+    """
+    SQLite store of the last good price per symbol, with when and where it was fetched.
+    Survives between runs (and processes) in the scraper cache directory.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS quotes (
+                symbol TEXT PRIMARY KEY,
+                price REAL NOT NULL,
+                source TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, symbol: str) -> Optional[StoredQuote]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT price, source, fetched_at FROM quotes WHERE symbol = ?", (normalize_symbol(symbol),)
+            ).fetchone()
+        return StoredQuote(*row) if row else None
+
+    def put_many(self, prices: Dict[str, float], source: str, fetched_at: float = None):
+        if not prices:
+            return
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO quotes (symbol, price, source, fetched_at) VALUES (?, ?, ?, ?)",
+                [(normalize_symbol(symbol), price, source, fetched_at) for symbol, price in prices.items()]
+            )
+            self._db.commit()
+
+    def put(self, symbol: str, price: float, source: Optional[str]):
+        self.put_many({symbol: price}, source)
+
+
+class RevalidatingQuotes:
+    """
+    Quote fetcher on top of a QuoteStore:
+      - stored quote younger than `fresh_seconds`: returned, no network
+      - otherwise fetched now (and stored if it succeeds)
+      - if that fetch fails, the stored quote is served up to `max_age_seconds`,
+        marked stale when it is older than `alert_max_age_seconds`
+    Stale quotes are for last_price only; alerts are never decided on them.
+    """
+
+    def __init__(self, fetcher: Callable[[str], Quote], store: QuoteStore,
+                 fresh_seconds: float = QUOTE_FRESH_SECONDS,
+                 alert_max_age_seconds: float = QUOTE_ALERT_MAX_AGE_SECONDS,
+                 max_age_seconds: float = QUOTE_MAX_AGE_SECONDS):
+        self._fetcher = fetcher
+        self.store = store
+        self.alert_max_age_seconds = alert_max_age_seconds
+        # A cached quote skips the fetch, so it must be good enough for alerts
+        self.fresh_seconds = min(fresh_seconds, alert_max_age_seconds)
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self.fresh_hits = 0
+        self.stale_served = 0
+
+    def _stored(self, symbol: str) -> Optional[StoredQuote]:
+        try:
+            return self.store.get(symbol)
+        except Exception as e:
+            log.warning(f"Quote store read failed for {symbol}: {e}")
+            return None
+
+    def get(self, symbol: str) -> Quote:
+        stored = self._stored(symbol)
+        if stored is not None:
+            age = time.time() - stored.fetched_at
+            if age <= self.fresh_seconds:
+                with self._lock:
+                    self.fresh_hits += 1
+                return Quote(stored.price, None, f"{stored.source}, cached {age:.0f}s")
+
+        quote = self._fetcher(symbol)
+        if quote.price is not None:
+            try:
+                self.store.put(symbol, quote.price, quote.source)
+            except Exception as e:
+                log.warning(f"Could not store quote for {symbol}: {e}")
+            return quote
+
+        # Upstream failed: fall back to the last good price (re-read, another worker may have stored one)
+        stored = self._stored(symbol)
+        if stored is not None:
+            age = time.time() - stored.fetched_at
+            if age <= self.max_age_seconds:
+                with self._lock:
+                    self.stale_served += 1
+                log.warning(f"Using stored price for {symbol} ({age:.0f}s old)")
+                return Quote(stored.price, None, f"{stored.source}, stored {age:.0f}s",
+                             stale=age > self.alert_max_age_seconds)
+        return quote
+
+
+_store: Optional[QuoteStore] = None
+_store_lock = threading.Lock()
+_store_disabled = False
+
+
+def get_quote_store() -> Optional[QuoteStore]:
+    """Open the on-disk quote store on first use (None if it can't be opened)"""
+    global _store, _store_disabled
+    if _store is None and not _store_disabled:
+        with _store_lock:
+            if _store is None and not _store_disabled:
+                try:
+                    _store = QuoteStore(os.path.join(CACHE_DIR, 'quotes.sqlite3'))
+                except Exception as e:
+                    log.warning(f"Quote store unavailable, continuing without it: {e}")
+                    _store_disabled = True
+    return _store
@@ -0,0 +1,88 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Tuple
+
+log = logging.getLogger(__name__)
+
+# Default (requests per second, burst) for each upstream we talk to.
+# Override with e.g. RATE_LIMIT_NSE="3/5" (rate 3/s, burst 5) or RATE_LIMIT_NSE="3".
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    'nse': (3.0, 5.0),
+    'yahoo': (5.0, 10.0),
+    'google': (2.0, 4.0),
+    'bse': (2.0, 4.0),
+    # Global cap only; each webhook is paced by Discord's own rate-limit headers
+    'discord': (10.0, 10.0),
+    'supabase': (10.0, 20.0),
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    Refills `rate` tokens per second up to `capacity`; acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+
+            # Sleep outside the lock so other threads can refill/check meanwhile
+            time.sleep(wait)
+
+
+def _parse_limit(name: str) -> Tuple[float, float]:
+    rate, burst = DEFAULT_RATE_LIMITS.get(name, (5.0, 5.0))
+    override = os.environ.get(f"RATE_LIMIT_{name.upper()}")
+    if override:
+        try:
+            parts = override.split('/')
+            new_rate = float(parts[0])
+            new_burst = float(parts[1]) if len(parts) > 1 else max(new_rate, 1.0)
+        except ValueError:
+            log.warning(f"Ignoring invalid RATE_LIMIT_{name.upper()}={override!r}")
+            return rate, burst
+        # A zero rate never refills and a burst below one token can never be acquired
+        if not (new_rate > 0 and new_burst >= 1):
+            log.warning(f"Ignoring RATE_LIMIT_{name.upper()}={override!r}: rate must be > 0 and burst >= 1")
+            return rate, burst
+        rate, burst = new_rate, new_burst
+    return rate, burst
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> TokenBucket:
+    """Return the shared token bucket for an upstream provider"""
+    bucket = _buckets.get(name)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(name)
+            if bucket is None:
+                bucket = TokenBucket(*_parse_limit(name))
+                _buckets[name] = bucket
+    return bucket
+
+
+def throttle(name: str):
+    """Block until the named upstream's rate limit allows another request"""
+    get_limiter(name).acquire()
@@ -0,0 +1,167 @@
+import os
+import math
+import time
+import heapq
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from quote_cache import normalize_symbol
+from positions import Position
+
+log = logging.getLogger(__name__)
+
+# Bounds on how often one symbol is polled
+SCHEDULER_MIN_INTERVAL_SECONDS = float(os.environ.get("SCHEDULER_MIN_INTERVAL_SECONDS", "15"))
+SCHEDULER_MAX_INTERVAL_SECONDS = float(os.environ.get("SCHEDULER_MAX_INTERVAL_SECONDS", "600"))
+# Poll after this fraction of the expected time-to-target (smaller = more cautious)
+SCHEDULER_SAFETY_FACTOR = float(os.environ.get("SCHEDULER_SAFETY_FACTOR", "0.25"))
+# Volatility assumed until a symbol has a few observations (2% per 6h15m session)
+DEFAULT_DAILY_VOLATILITY = 0.02
+SESSION_SECONDS = 6.25 * 3600
+# EWMA weight of the newest squared return
+VOLATILITY_ALPHA = 0.3
+
+
+class SymbolState:
+    """Scheduling state of one symbol"""
+    __slots__ = ('symbol', 'profit_target', 'loss_target', 'cooldown_only',
+                 'price', 'polled_at', 'variance_rate', 'due')
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        # Nearest targets over the symbol's positions that are not in cooldown
+        self.profit_target: Optional[float] = None
+        self.loss_target: Optional[float] = None
+        self.cooldown_only = False
+        self.price: Optional[float] = None
+        self.polled_at: Optional[float] = None
+        # Squared log-return per second (EWMA)
+        self.variance_rate = (DEFAULT_DAILY_VOLATILITY ** 2) / SESSION_SECONDS
+        self.due = 0.0
+
+    def distance(self) -> Optional[float]:
+        """Fractional distance from the last price to the nearest target (0 if already crossed)"""
+        if self.price is None or self.price <= 0:
+            return None
+        distances = []
+        if self.profit_target is not None:
+            distances.append((self.profit_target - self.price) / self.price)
+        if self.loss_target is not None:
+            distances.append((self.price - self.loss_target) / self.price)
+        if not distances:
+            return None
+        return max(0.0, min(distances))
+
+
+class PollScheduler:
+    """
+    Decides when each symbol is polled next.
+    The wait is a fraction of the expected time for the price to move from its
+    last value to the nearest profit/loss target, treating the price as a random
+    walk with the symbol's recent volatility: t ~ (distance / sigma)^2.
+    Symbols whose positions are all in cooldown wait the maximum interval.
+    """
+
+    def __init__(self, min_interval: float = SCHEDULER_MIN_INTERVAL_SECONDS,
+                 max_interval: float = SCHEDULER_MAX_INTERVAL_SECONDS,
+                 safety_factor: float = SCHEDULER_SAFETY_FACTOR):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.safety_factor = safety_factor
+        self._lock = threading.Lock()
+        self._states: Dict[str, SymbolState] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def interval(self, state: SymbolState) -> float:
+        """Seconds until the symbol should be polled again"""
+        if state.cooldown_only:
+            return self.max_interval
+        distance = state.distance()
+        if distance is None:
+            return self.min_interval
+        expected = (distance ** 2) / max(state.variance_rate, 1e-12)
+        return min(self.max_interval, max(self.min_interval, expected * self.safety_factor))
+
+    def _schedule(self, state: SymbolState, due: float):
+        state.due = due
+        heapq.heappush(self._heap, (due, normalize_symbol(state.symbol)))
+
+    def update_positions(self, positions: Iterable[Position], now: Optional[float] = None):
+        """Recompute each symbol's nearest targets from a fresh list of active positions"""
+        now = now if now is not None else time.time()
+        targets: Dict[str, SymbolState] = {}
+        for position in positions:
+            state = targets.get(position.key)
+            if state is None:
+                state = targets[position.key] = SymbolState(position.symbol)
+                state.cooldown_only = True
+
+            if position.in_cooldown(now):
+                continue
+            state.cooldown_only = False
+            if state.profit_target is None or position.profit_target < state.profit_target:
+                state.profit_target = position.profit_target
+            if state.loss_target is None or position.loss_target > state.loss_target:
+                state.loss_target = position.loss_target
+
+        monotonic_now = time.monotonic()
+        with self._lock:
+            for key in [key for key in self._states if key not in targets]:
+                del self._states[key]
+
+            for key, fresh in targets.items():
+                state = self._states.get(key)
+                if state is None:
+                    # New symbol: poll it right away
+                    self._states[key] = fresh
+                    self._schedule(fresh, monotonic_now)
+                    continue
+
+                state.profit_target, state.loss_target = fresh.profit_target, fresh.loss_target
+                state.cooldown_only = fresh.cooldown_only
+                # (symbols handed out by due() are rescheduled by record())
+                if state.polled_at is not None and state.due != math.inf:
+                    # Targets may have moved closer: never wait longer than the new interval
+                    due = min(state.due, state.polled_at + self.interval(state))
+                    if due < state.due:
+                        self._schedule(state, due)
+
+    def due(self, limit: Optional[int] = None) -> List[str]:
+        """
+        Symbols whose poll time has come, most overdue first.
+        They stay out of the schedule until record() is called for them.
+        """
+        now = time.monotonic()
+        symbols = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(symbols) < limit):
+                due, key = heapq.heappop(self._heap)
+                state = self._states.get(key)
+                # Skip entries superseded by a reschedule or a removed symbol
+                if state is None or state.due != due:
+                    continue
+                state.due = math.inf
+                symbols.append(state.symbol)
+        return symbols
+
+    def record(self, symbol: str, price: Optional[float]):
+        """Store a poll result (None = no price) and schedule the symbol's next poll"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(normalize_symbol(symbol))
+            if state is None:
+                return
+            if price is not None and price > 0:
+                if state.price and state.polled_at is not None and now > state.polled_at:
+                    log_return = math.log(price / state.price)
+                    rate = (log_return ** 2) / (now - state.polled_at)
+                    state.variance_rate = (1 - VOLATILITY_ALPHA) * state.variance_rate + VOLATILITY_ALPHA * rate
+                state.price = price
+                state.polled_at = now
+                self._schedule(state, now + self.interval(state))
+            else:
+                # Nothing to go on: retry soon, unless there is nothing to alert on anyway
+                self._schedule(state, now + (self.max_interval if state.cooldown_only else self.min_interval))
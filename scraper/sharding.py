@@ -0,0 +1,91 @@
+"""
+Watchlist sharding: `--shard i/N` runs only the positions whose symbol hashes to shard i.
+All positions on a symbol land on the same shard, so each symbol is still fetched once.
+
+Merge the per-shard run summaries (written with --summary-json) after a matrix run:
+
+    python scraper/sharding.py summary-*.json --output summary.json
+"""
+
+import sys
+import json
+import zlib
+import argparse
+from typing import Dict, List, Optional, Tuple
+from quote_cache import normalize_symbol
+
+# Summary fields that are per-shard counts (added up when merging)
+COUNT_FIELDS = ('positions', 'fetches', 'cache_hits', 'fetches_saved', 'due_symbols', 'store_fresh', 'store_stale')
+
+
+def parse_shard(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'2/4' -> (2, 4); shards are numbered 0 .. N-1. None/'' means no sharding."""
+    if not spec:
+        return None
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N (e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}': need 0 <= i < N")
+    return index, count
+
+
+def shard_of(symbol: str, count: int) -> int:
+    """Stable shard number of a symbol (same in every process, unlike hash())"""
+    return zlib.crc32(normalize_symbol(symbol).encode('utf-8')) % count
+
+
+def in_shard(symbol: str, shard: Optional[Tuple[int, int]]) -> bool:
+    if shard is None:
+        return True
+    index, count = shard
+    return shard_of(symbol, count) == index
+
+
+def merge_summaries(summaries: List[Dict]) -> Dict:
+    """Combine per-shard run summaries into one"""
+    merged: Dict = {field: 0 for field in COUNT_FIELDS if any(field in s for s in summaries)}
+    for summary in summaries:
+        for field in merged:
+            merged[field] += summary.get(field, 0)
+
+    merged['shards'] = len(summaries)
+    # Shards run in parallel: the slowest one is the tick's wall-clock time
+    durations = [s['elapsed_seconds'] for s in summaries if 'elapsed_seconds' in s]
+    if durations:
+        merged['elapsed_seconds'] = max(durations)
+        merged['total_shard_seconds'] = round(sum(durations), 2)
+
+    expected = {s['shard_count'] for s in summaries if 'shard_count' in s}
+    if len(expected) == 1:
+        seen = {s.get('shard') for s in summaries}
+        merged['missing_shards'] = sorted(set(range(expected.pop())) - seen)
+    return merged
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Merge per-shard scraper run summaries")
+    parser.add_argument('summaries', nargs='+', help="Summary JSON files written with --summary-json")
+    parser.add_argument('--output', help="Write the merged summary to this file")
+    args = parser.parse_args(argv)
+
+    summaries = []
+    for path in args.summaries:
+        with open(path) as f:
+            summaries.append(json.load(f))
+
+    merged = merge_summaries(summaries)
+    print(json.dumps(merged, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(merged, f, indent=2)
+
+    if merged.get('missing_shards'):
+        print(f"❌ Missing summaries for shard(s) {merged['missing_shards']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
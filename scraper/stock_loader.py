@@ -0,0 +1,139 @@
+import os
+import time
+import logging
+from typing import Callable, Dict, Iterator, List, Optional
+from rate_limiter import throttle
+
+log = logging.getLogger(__name__)
+
+# Only the stock columns the scraper reads
+STOCK_COLUMNS = "id, user_id, symbol, buy_price, profit_alert_pct, loss_alert_pct, last_alert_sent"
+# alert_digest_threshold is optional (see README); dropped if the column does not exist
+PROFILE_COLUMNS = "discord_webhook, alert_digest_threshold"
+PROFILE_COLUMNS_MINIMAL = "discord_webhook"
+
+# Rows per page; stays below PostgREST's default max-rows (1000)
+STOCKS_PAGE_SIZE = int(os.environ.get("STOCKS_PAGE_SIZE", "500"))
+# Incremental syncs can't see deleted rows or profile changes: reload everything this often
+STOCKS_FULL_SYNC_SECONDS = int(os.environ.get("STOCKS_FULL_SYNC_SECONDS", "900"))
+
+EPOCH = '1970-01-01T00:00:00+00:00'
+
+
+class StockLoader:
+    """
+    Pages through `stocks` (joined with the owner's profile) with keyset
+    pagination on id: `id > last id seen ORDER BY id LIMIT page`, until a page
+    comes back empty, so the server's row cap can't truncate the load and OFFSET never grows.
+    """
+
+    def __init__(self, client, page_size: int = STOCKS_PAGE_SIZE):
+        self._client = client
+        self.page_size = page_size
+        self._profile_columns = PROFILE_COLUMNS
+
+    def _select(self, extra_columns: str = ""):
+        columns = f"{STOCK_COLUMNS}{extra_columns}, profiles({self._profile_columns})"
+        return self._client.table('stocks').select(columns)
+
+    def _page(self, after_id, active_only: bool, changed_since: Optional[str]) -> List[Dict]:
+        extra = ", is_active, updated_at" if changed_since is not None else ""
+        query = self._select(extra)
+        if active_only:
+            query = query.eq('is_active', True)
+        if changed_since is not None:
+            query = query.gt('updated_at', changed_since)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        throttle('supabase')
+        return query.order('id').limit(self.page_size).execute().data
+
+    def iter_stocks(self, active_only: bool = True, changed_since: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield stock rows page by page.
+        With `changed_since`, only rows whose updated_at is later (active or not) are returned.
+        """
+        after_id = None
+        while True:
+            try:
+                rows = self._page(after_id, active_only, changed_since)
+            except Exception as e:
+                if self._profile_columns != PROFILE_COLUMNS_MINIMAL and 'alert_digest_threshold' in str(e):
+                    log.info("profiles.alert_digest_threshold not found, loading webhooks only")
+                    self._profile_columns = PROFILE_COLUMNS_MINIMAL
+                    continue
+                raise
+
+            # A short page isn't the end: the server's max-rows may be below page_size
+            if not rows:
+                return
+            yield from rows
+            after_id = rows[-1]['id']
+
+    def latest_update(self) -> str:
+        """Newest stocks.updated_at (EPOCH for an empty table); raises if the column doesn't exist"""
+        throttle('supabase')
+        rows = (self._client.table('stocks').select('updated_at')
+                .order('updated_at', desc=True).limit(1).execute().data)
+        return rows[0]['updated_at'] if rows else EPOCH
+
+
+class StockSync:
+    """
+    The active positions, kept up to date between sweeps of a long-running process.
+    After one full load, each refresh() fetches only the rows whose `updated_at`
+    is past the newest value seen (the watermark); deactivated rows are dropped.
+    A full reload runs every `full_sync_seconds`, and whenever `updated_at` is missing.
+    Rows are kept as `parse(row)`; rows it returns None for are skipped.
+    """
+
+    def __init__(self, loader: StockLoader, parse: Callable[[Dict], object] = None,
+                 full_sync_seconds: int = STOCKS_FULL_SYNC_SECONDS):
+        self.loader = loader
+        self.parse = parse or (lambda row: row)
+        self.full_sync_seconds = full_sync_seconds
+        self._stocks: Dict[object, object] = {}
+        self._watermark: Optional[str] = None
+        self._full_synced_at: Optional[float] = None
+        self._incremental = True
+
+    def _full_sync(self):
+        # Take the watermark first so changes made during the load are picked up next time
+        if self._incremental:
+            try:
+                self._watermark = self.loader.latest_update()
+            except Exception as e:
+                log.warning(f"stocks.updated_at not available, reloading all stocks every sync: {e}")
+                self._incremental = False
+
+        stocks = {}
+        for row in self.loader.iter_stocks():
+            stock = self.parse(row)
+            if stock is not None:
+                stocks[row['id']] = stock
+        self._stocks = stocks
+        self._full_synced_at = time.monotonic()
+        log.info(f"Loaded {len(self._stocks)} active stock(s)")
+
+    def refresh(self) -> List:
+        """Bring the positions up to date and return them"""
+        due_full = (self._full_synced_at is None or not self._incremental
+                    or time.monotonic() - self._full_synced_at >= self.full_sync_seconds)
+        if due_full:
+            self._full_sync()
+            return list(self._stocks.values())
+
+        changed = 0
+        for row in self.loader.iter_stocks(active_only=False, changed_since=self._watermark):
+            changed += 1
+            if row.get('updated_at') and row['updated_at'] > self._watermark:
+                self._watermark = row['updated_at']
+            stock = self.parse(row) if row.get('is_active') else None
+            if stock is not None:
+                self._stocks[row['id']] = stock
+            else:
+                self._stocks.pop(row['id'], None)
+
+        if changed:
+            log.info(f"Synced {changed} changed stock(s), {len(self._stocks)} active")
+        return list(self._stocks.values())
@@ -1,14 +1,147 @@
+import os
+import time
+import sqlite3
 import requests
 import logging
-from typing import Optional
+import threading
+from typing import Optional, Tuple
+from rate_limiter import throttle
 
 log = logging.getLogger(__name__)
 
+# Local cache directory, persisted between GitHub Actions runs via actions/cache
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+
+# How long a resolved name (or a name that did not resolve) is trusted
+RESOLVER_CACHE_TTL_SECONDS = int(os.environ.get("RESOLVER_CACHE_TTL_SECONDS", str(24 * 3600)))
+RESOLVER_NEGATIVE_TTL_SECONDS = int(os.environ.get("RESOLVER_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+RESOLVER_CACHE_MAX_ENTRIES = int(os.environ.get("RESOLVER_CACHE_MAX_ENTRIES", "5000"))
+
+# Marks "Yahoo could not be asked" as opposed to "Yahoo found nothing"
+_LOOKUP_FAILED = object()
+
+
+class ResolverCache:
+    """
+    Small SQLite store of name -> symbol lookups.
+    Entries expire after a TTL, names that don't resolve are cached as NULL,
+    and the least recently used entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, path: str, ttl: int = RESOLVER_CACHE_TTL_SECONDS,
+                 negative_ttl: int = RESOLVER_NEGATIVE_TTL_SECONDS,
+                 max_entries: int = RESOLVER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS resolved_symbols (
+                query TEXT PRIMARY KEY,
+                symbol TEXT,
+                resolved_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return ' '.join(query.split()).lower()
+
+    def get(self, query: str) -> Tuple[bool, Optional[str]]:
+        """Returns: (hit, symbol). A hit with symbol None is a cached 'not found'"""
+        key = self._key(query)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT symbol, resolved_at FROM resolved_symbols WHERE query = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+
+            symbol, resolved_at = row
+            ttl = self.ttl if symbol else self.negative_ttl
+            if now - resolved_at > ttl:
+                return False, None
+
+            self._db.execute("UPDATE resolved_symbols SET last_used = ? WHERE query = ?", (now, key))
+            self._db.commit()
+            return True, symbol
+
+    def put(self, query: str, symbol: Optional[str]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO resolved_symbols (query, symbol, resolved_at, last_used) VALUES (?, ?, ?, ?)",
+                (self._key(query), symbol, now, now)
+            )
+            # LRU eviction
+            self._db.execute("""
+                DELETE FROM resolved_symbols WHERE query NOT IN (
+                    SELECT query FROM resolved_symbols ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+            self._db.commit()
+
+
+_cache: Optional[ResolverCache] = None
+_cache_lock = threading.Lock()
+_cache_disabled = False
+
+
+def get_resolver_cache() -> Optional[ResolverCache]:
+    """Open the on-disk resolver cache on first use (None if it can't be opened)"""
+    global _cache, _cache_disabled
+    if _cache is None and not _cache_disabled:
+        with _cache_lock:
+            if _cache is None and not _cache_disabled:
+                try:
+                    _cache = ResolverCache(os.path.join(CACHE_DIR, 'resolver.sqlite3'))
+                except Exception as e:
+                    log.warning(f"Resolver cache unavailable, continuing without it: {e}")
+                    _cache_disabled = True
+    return _cache
+
+
 def search_symbol(query: str) -> Optional[str]:
     """
-    Search for a stock symbol on Yahoo Finance using the company name.
+    Resolve a company name to a stock symbol, using the on-disk cache when possible.
     Prioritizes NSE (.NS) and BSE (.BO) symbols.
     """
+    cache = get_resolver_cache()
+    if cache:
+        try:
+            hit, symbol = cache.get(query)
+        except Exception as e:
+            # A locked or corrupt cache must not stop the lookup: treat it as a miss
+            log.warning(f"Could not read resolver cache for '{query}': {e}")
+            hit, symbol = False, None
+        if hit:
+            log.info(f"Resolver cache hit for '{query}': {symbol or 'no match'}")
+            return symbol
+
+    result = _search_symbol_remote(query)
+    if result is _LOOKUP_FAILED:
+        # Don't cache transient errors, only real answers
+        return None
+
+    if cache:
+        try:
+            cache.put(query, result)
+        except Exception as e:
+            log.warning(f"Could not write resolver cache for '{query}': {e}")
+    return result
+
+
+def _search_symbol_remote(query: str):
+    """
+    Search for a stock symbol on Yahoo Finance using the company name.
+    Returns the symbol, None if nothing matched, or _LOOKUP_FAILED on errors.
+    """
     try:
         # Yahoo Finance Auto-Complete API
         url = "https://query1.finance.yahoo.com/v1/finance/search"
@@ -19,24 +152,25 @@ def search_symbol(query: str) -> Optional[str]:
             'enableFuzzyQuery': 'false',
             'quotesQueryId': 'tss_match_phrase_query'
         }
-        
+
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
 
+        throttle('yahoo')
         response = requests.get(url, params=params, headers=headers, timeout=5)
-        
+
         if response.status_code == 200:
             data = response.json()
             quotes = data.get('quotes', [])
-            
+
             # 1. Look for NSE symbol first
             for quote in quotes:
                 symbol = quote.get('symbol', '')
                 if symbol.endswith('.NS'):
                     log.info(f"Resolved '{query}' to NSE symbol: {symbol}")
                     return symbol
-            
+
             # 2. Look for BSE symbol
             for quote in quotes:
                 symbol = quote.get('symbol', '')
@@ -49,10 +183,13 @@ def search_symbol(query: str) -> Optional[str]:
                 symbol = quotes[0].get('symbol')
                 log.info(f"Resolved '{query}' to generic symbol: {symbol}")
                 return symbol
-                
+
             log.warning(f"No matching symbols found for '{query}'")
             return None
-            
+
+        log.warning(f"Yahoo search returned status {response.status_code} for '{query}'")
+
     except Exception as e:
         log.error(f"Error searching symbol for '{query}': {e}")
-        return None
+
+    return _LOOKUP_FAILED
@@ -0,0 +1,71 @@
+"""
+Discord message packing and per-user digests.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from discord_notifier import (  # noqa: E402
+    DiscordNotifier, QueuedAlert, DISCORD_MAX_EMBEDS, DISCORD_MAX_EMBED_CHARS, embed_length
+)
+
+
+def embed(title: str, description: str = '') -> dict:
+    return {'title': title, 'description': description}
+
+
+class RecordingNotifier(DiscordNotifier):
+    """Keeps what would have been posted instead of calling Discord"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.posts = []
+
+    def _post(self, webhook_url, embeds):
+        self.posts.append((webhook_url, [e['title'] for e in embeds]))
+        return True
+
+
+class PackingTest(unittest.TestCase):
+
+    def test_at_most_ten_embeds_per_message(self):
+        items = [QueuedAlert(embed(f"alert {i}")) for i in range(23)]
+        messages = DiscordNotifier()._messages(items, None)
+        self.assertEqual([len(embeds) for _, embeds in messages], [10, 10, 3])
+        self.assertTrue(all(len(embeds) <= DISCORD_MAX_EMBEDS for _, embeds in messages))
+        # Order is kept and every alert is covered exactly once
+        self.assertEqual([item for alerts, _ in messages for item in alerts], items)
+
+    def test_text_limit_splits_messages(self):
+        items = [QueuedAlert(embed(f"alert {i}", 'x' * 2500)) for i in range(5)]
+        messages = DiscordNotifier()._messages(items, None)
+        self.assertEqual([len(embeds) for _, embeds in messages], [2, 2, 1])
+        for _, embeds in messages:
+            self.assertLessEqual(sum(embed_length(e) for e in embeds), DISCORD_MAX_EMBED_CHARS)
+
+    def test_embed_length_counts_fields_and_footer(self):
+        value = {'title': 'ab', 'description': 'cde', 'footer': {'text': 'f'},
+                 'fields': [{'name': 'gh', 'value': 'ij', 'inline': True}]}
+        self.assertEqual(embed_length(value), 10)
+
+
+class DigestTest(unittest.TestCase):
+
+    def test_thresholds_are_per_user_on_a_shared_webhook(self):
+        notifier = RecordingNotifier(digest_builder=lambda rows: embed(f"digest of {len(rows)}"))
+        for i in range(3):
+            notifier.enqueue('https://hook', embed(f"a{i}"), summary={'i': i}, digest_threshold=1, user_id=1)
+            notifier.enqueue('https://hook', embed(f"b{i}"), summary={'i': i}, digest_threshold=5, user_id=2)
+
+        self.assertEqual(notifier.flush(), (6, 0))
+        self.assertEqual(notifier.posts, [('https://hook', ['digest of 3']), ('https://hook', ['b0', 'b1', 'b2'])])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Vectorized alert evaluation and the streaming trigger index.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+import numpy as np  # noqa: E402
+from evaluator import PositionArrays, evaluate  # noqa: E402
+from positions import Position  # noqa: E402
+from trigger_index import TriggerIndex  # noqa: E402
+
+
+def position(stock_id: int, symbol: str = 'TCS', buy_price: float = 100.0,
+             profit_pct: float = 25, loss_pct: float = 25, cooldown_until: float = 0.0) -> Position:
+    return Position(stock_id, 1, symbol, buy_price, profit_pct, loss_pct, cooldown_until=cooldown_until)
+
+
+class EvaluateTest(unittest.TestCase):
+
+    def run_evaluate(self, positions, prices):
+        return evaluate(PositionArrays(positions), np.array(prices, dtype=float), time.time())
+
+    def test_crossings(self):
+        # targets: profit 125, loss 75
+        result = self.run_evaluate([position(1), position(2), position(3), position(4)],
+                                   [125.0, 75.0, 100.0, 74.0])
+        self.assertEqual(result.profit.tolist(), [True, False, False, False])
+        self.assertEqual(result.loss.tolist(), [False, True, False, True])
+        self.assertEqual(result.triggered().tolist(), [0, 1, 3])
+
+    def test_profit_wins_over_loss(self):
+        # Negative percentages put the profit target below the loss target: 100 crosses both
+        result = self.run_evaluate([position(1, profit_pct=-5, loss_pct=-5)], [100.0])
+        self.assertTrue(result.profit[0])
+        self.assertFalse(result.loss[0])
+
+    def test_missing_price_never_alerts(self):
+        with np.errstate(all='raise'):
+            result = self.run_evaluate([position(1), position(2, profit_pct=-5, loss_pct=-5)], [np.nan, np.nan])
+        self.assertEqual(result.triggered().tolist(), [])
+        self.assertTrue(np.isnan(result.percentage_change).all())
+
+    def test_cooldown_never_alerts(self):
+        result = self.run_evaluate([position(1, cooldown_until=time.time() + 60)], [150.0])
+        self.assertTrue(result.in_cooldown[0])
+        self.assertEqual(result.triggered().tolist(), [])
+
+
+class TriggerIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TriggerIndex()
+        # TCS targets: (125, 75), (150, 50), (112.5, 87.5); INFY: (125, 75)
+        self.index.sync([
+            position(1), position(2, profit_pct=50, loss_pct=50), position(3, profit_pct=12.5, loss_pct=12.5),
+            position(4, symbol='INFY'),
+        ])
+
+    def crossed_ids(self, symbol: str, price: float):
+        profit, loss = self.index.crossed(symbol, price)
+        return sorted(p.id for p in profit), sorted(p.id for p in loss)
+
+    def test_targets_are_inclusive(self):
+        self.assertEqual(self.crossed_ids('TCS', 125.0), ([1, 3], []))
+        self.assertEqual(self.crossed_ids('TCS', 75.0), ([], [1, 3]))
+        self.assertEqual(self.crossed_ids('TCS', 100.0), ([], []))
+        self.assertEqual(self.crossed_ids('TCS', 50.0), ([], [1, 2, 3]))
+
+    def test_symbols_are_normalized_and_separate(self):
+        self.assertEqual(self.crossed_ids('tcs.ns', 150.0), ([1, 2, 3], []))
+        self.assertEqual(self.crossed_ids('INFY', 150.0), ([4], []))
+        self.assertEqual(self.crossed_ids('WIPRO', 150.0), ([], []))
+
+    def test_crossing_both_counts_as_profit(self):
+        self.index.add(position(5, profit_pct=-5, loss_pct=-5))
+        profit, loss = self.crossed_ids('TCS', 100.0)
+        self.assertIn(5, profit)
+        self.assertNotIn(5, loss)
+
+    def test_sync_moves_and_removes_entries(self):
+        added, updated, removed = self.index.sync([
+            position(1, profit_pct=75), position(2, profit_pct=50, loss_pct=50), position(6),
+        ])
+        self.assertEqual((added, updated, removed), (1, 1, 2))
+        self.assertEqual(self.crossed_ids('TCS', 150.0), ([2, 6], []))
+        self.assertEqual(self.crossed_ids('INFY', 150.0), ([], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Circuit breaker behaviour of the quote providers.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+import requests  # noqa: E402
+from providers import CLOSED, OPEN, ProviderUnavailable, QuoteProvider  # noqa: E402
+from nse_client import NSEClient  # noqa: E402
+from yahoo_client import YahooClient  # noqa: E402
+
+UNKNOWN_SYMBOLS = ['DHFL', 'JETAIRWAYS', 'RCOM', 'RELAINCE', 'SINTEX']
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = ''
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """Answers every GET with the same response (or raises `error`)"""
+
+    def __init__(self, response: FakeResponse = None, error: Exception = None):
+        self.response = response
+        self.error = error
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+
+def down(symbol):
+    raise ProviderUnavailable("upstream returned 503")
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_unknown_symbols_leave_circuit_closed(self):
+        provider = QuoteProvider('nse', lambda symbol: None, priority=0, failure_threshold=5)
+        for symbol in UNKNOWN_SYMBOLS * 2:
+            self.assertIsNone(provider.call(symbol))
+        self.assertEqual(provider.state, CLOSED)
+        self.assertTrue(provider.allow())
+        self.assertAlmostEqual(provider.health(), 1.0)
+
+    def test_upstream_failures_open_circuit(self):
+        provider = QuoteProvider('nse', down, priority=0, failure_threshold=5)
+        for symbol in UNKNOWN_SYMBOLS:
+            self.assertIsNone(provider.call(symbol))
+        self.assertEqual(provider.state, OPEN)
+        self.assertFalse(provider.allow())
+
+    def test_probe_for_unknown_symbol_closes_circuit(self):
+        provider = QuoteProvider('nse', down, priority=0, failure_threshold=1, open_seconds=0)
+        provider.call('TCS')
+        self.assertEqual(provider.state, OPEN)
+        provider.fetch = lambda symbol: None
+        self.assertTrue(provider.allow())
+        provider.call('DHFL')
+        self.assertEqual(provider.state, CLOSED)
+
+
+class ClientStatusTest(unittest.TestCase):
+
+    def nse_client(self, session: FakeSession) -> NSEClient:
+        client = NSEClient()
+        client.session = session
+        client._warmed_at = float('inf')
+        return client
+
+    def test_nse_unknown_symbol_is_not_an_outage(self):
+        provider = QuoteProvider('nse', lambda symbol: None, priority=0, failure_threshold=5)
+        client = self.nse_client(FakeSession(FakeResponse(404)))
+        provider.fetch = lambda symbol: client.get_json('/api/quote-equity', {'symbol': symbol})
+        for symbol in UNKNOWN_SYMBOLS:
+            provider.call(symbol)
+        self.assertEqual(provider.state, CLOSED)
+
+    def test_nse_server_error_raises(self):
+        client = self.nse_client(FakeSession(FakeResponse(503)))
+        with self.assertRaises(ProviderUnavailable):
+            client.get_json('/api/quote-equity', {'symbol': 'TCS'})
+
+    def test_yahoo_chart_statuses(self):
+        client = YahooClient()
+        client.session = FakeSession(FakeResponse(404))
+        self.assertIsNone(client.get_chart_price('DHFL.NS'))
+        client.session = FakeSession(FakeResponse(503))
+        with self.assertRaises(ProviderUnavailable):
+            client.get_chart_price('TCS.NS')
+        client.session = FakeSession(error=requests.ConnectionError("connection refused"))
+        with self.assertRaises(ProviderUnavailable):
+            client.get_chart_price('TCS.NS')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Per-run quote cache.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from quote_cache import NO_QUOTE, Quote, QuoteCache  # noqa: E402
+
+
+class CoalescingTest(unittest.TestCase):
+
+    def test_concurrent_lookups_share_one_fetch(self):
+        release = threading.Event()
+        calls = []
+
+        def fetch(symbol):
+            calls.append(symbol)
+            release.wait(5)
+            return Quote(100.0, None, 'test')
+
+        cache = QuoteCache(fetch)
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(cache.get, symbol) for symbol in ('TCS', 'tcs', 'TCS.NS', ' TCS', 'tcs.ns')]
+            # Let every lookup reach the cache before the fetch returns
+            while cache.fetches + cache.hits < 5:
+                threading.Event().wait(0.01)
+            release.set()
+            quotes = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(quote.price == 100.0 for quote in quotes))
+        self.assertEqual((cache.fetches, cache.hits), (1, 4))
+
+    def test_failures_are_cached(self):
+        calls = []
+
+        def fetch(symbol):
+            calls.append(symbol)
+            raise RuntimeError("upstream down")
+
+        cache = QuoteCache(fetch)
+        self.assertEqual(cache.get('TCS'), NO_QUOTE)
+        self.assertEqual(cache.get('TCS'), NO_QUOTE)
+        self.assertEqual(len(calls), 1)
+
+    def test_get_cached_never_fetches(self):
+        cache = QuoteCache(lambda symbol: self.fail("fetched"))
+        cache.seed({'INFY': 1500.0}, source='nse-bulk')
+        self.assertIsNone(cache.get_cached('TCS'))
+        self.assertEqual(cache.get_cached('infy').price, 1500.0)
+        self.assertEqual(cache.fetches_saved, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
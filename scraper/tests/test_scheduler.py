@@ -0,0 +1,65 @@
+"""
+Adaptive poll intervals.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import time
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from positions import Position  # noqa: E402
+from scheduler import PollScheduler, SymbolState  # noqa: E402
+
+
+def state(price=None, profit_target=None, loss_target=None, cooldown_only=False) -> SymbolState:
+    s = SymbolState('TCS')
+    s.price, s.profit_target, s.loss_target, s.cooldown_only = price, profit_target, loss_target, cooldown_only
+    return s
+
+
+class IntervalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PollScheduler(min_interval=15, max_interval=600, safety_factor=0.25)
+
+    def test_unknown_price_polls_at_the_minimum(self):
+        self.assertEqual(self.scheduler.interval(state(profit_target=110.0)), 15)
+
+    def test_cooldown_only_waits_the_maximum(self):
+        self.assertEqual(self.scheduler.interval(state(100.0, 100.5, 99.5, cooldown_only=True)), 600)
+
+    def test_intervals_are_clamped(self):
+        self.assertEqual(self.scheduler.interval(state(100.0, 100.01, 50.0)), 15)
+        self.assertEqual(self.scheduler.interval(state(100.0, 200.0, 50.0)), 600)
+        # Already past a target: as often as allowed
+        self.assertEqual(self.scheduler.interval(state(100.0, 90.0, 50.0)), 15)
+
+    def test_closer_targets_poll_sooner(self):
+        # 0.2-0.3% away at the default volatility falls between the bounds
+        near = self.scheduler.interval(state(100.0, 100.3, 50.0))
+        nearer = self.scheduler.interval(state(100.0, 100.2, 50.0))
+        self.assertTrue(15 < near < 600)
+        self.assertLess(nearer, near)
+
+
+class ScheduleTest(unittest.TestCase):
+
+    def test_new_symbols_are_due_until_recorded(self):
+        scheduler = PollScheduler(min_interval=15, max_interval=600)
+        scheduler.update_positions([Position(1, 1, 'TCS', 100.0, 10, 10),
+                                    Position(2, 1, 'INFY', 100.0, 10, 10, cooldown_until=time.time() + 60)])
+        self.assertEqual(sorted(scheduler.due()), ['INFY', 'TCS'])
+        # Handed out once, then out of the schedule until record()
+        self.assertEqual(scheduler.due(), [])
+        scheduler.record('TCS', 100.0)
+        scheduler.record('INFY', None)
+        self.assertEqual(scheduler.due(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Watchlist sharding and summary merging.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from sharding import in_shard, merge_summaries, parse_shard, shard_of  # noqa: E402
+
+
+class ShardTest(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        self.assertIsNone(parse_shard(''))
+        for spec in ('4/4', '-1/4', '1/0', 'a/b', '1'):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    parse_shard(spec)
+
+    def test_symbol_spellings_share_a_shard(self):
+        self.assertEqual(shard_of('TCS', 7), shard_of(' tcs.ns', 7))
+        # crc32, not hash(): the same in every process and on every run
+        self.assertEqual(shard_of('TCS', 1000), 206)
+
+    def test_every_symbol_in_exactly_one_shard(self):
+        symbols = [f"SYM{i}" for i in range(200)]
+        owners = [[index for index in range(4) if in_shard(symbol, (index, 4))] for symbol in symbols]
+        self.assertTrue(all(len(owner) == 1 for owner in owners))
+        self.assertEqual(len({owner[0] for owner in owners}), 4)
+        self.assertTrue(in_shard('TCS', None))
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_counts_add_up_and_slowest_shard_wins(self):
+        merged = merge_summaries([
+            {'shard': 0, 'shard_count': 3, 'positions': 10, 'fetches': 4, 'elapsed_seconds': 2.5},
+            {'shard': 2, 'shard_count': 3, 'positions': 5, 'fetches': 1, 'elapsed_seconds': 4.0},
+        ])
+        self.assertEqual(merged['positions'], 15)
+        self.assertEqual(merged['fetches'], 5)
+        self.assertEqual(merged['shards'], 2)
+        self.assertEqual(merged['elapsed_seconds'], 4.0)
+        self.assertEqual(merged['total_shard_seconds'], 6.5)
+        self.assertEqual(merged['missing_shards'], [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Keyset pagination of the stocks table.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from stock_loader import StockLoader  # noqa: E402
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Just enough of the PostgREST builder for StockLoader, capped at `max_rows` like the server"""
+
+    def __init__(self, client):
+        self.client = client
+        self.after_id = None
+        self.limit_rows = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def gt(self, column, value):
+        if column == 'id':
+            self.after_id = value
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, rows):
+        self.limit_rows = rows
+        return self
+
+    def execute(self):
+        self.client.pages += 1
+        rows = [row for row in self.client.rows if self.after_id is None or row['id'] > self.after_id]
+        return FakeResult(rows[:min(self.limit_rows, self.client.max_rows)])
+
+
+class FakeClient:
+    def __init__(self, count: int, max_rows: int):
+        self.rows = [{'id': stock_id} for stock_id in range(1, count + 1)]
+        self.max_rows = max_rows
+        self.pages = 0
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+class PaginationTest(unittest.TestCase):
+
+    def load(self, count: int, page_size: int, max_rows: int):
+        client = FakeClient(count, max_rows)
+        ids = [row['id'] for row in StockLoader(client, page_size=page_size).iter_stocks()]
+        return ids, client.pages
+
+    def test_every_row_once_in_id_order(self):
+        ids, pages = self.load(12, page_size=5, max_rows=1000)
+        self.assertEqual(ids, list(range(1, 13)))
+        self.assertEqual(pages, 4)
+
+    def test_server_row_cap_below_page_size(self):
+        # PostgREST max-rows of 3 turns every page of 5 into a short page
+        ids, _ = self.load(10, page_size=5, max_rows=3)
+        self.assertEqual(ids, list(range(1, 11)))
+
+    def test_empty_table(self):
+        self.assertEqual(self.load(0, page_size=5, max_rows=1000), ([], 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Tick history files survive interrupted writes.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from tick_history import TickHistory, day_of, _filename  # noqa: E402
+
+
+class TornWriteTest(unittest.TestCase):
+
+    def test_append_after_partial_record(self):
+        history = TickHistory(tempfile.mkdtemp(), keep_days=0)
+        now = time.time()
+        history.append('TCS', 3890.5, 'nse', ts=now - 5)
+        history.flush()
+
+        # A write cut short mid-record
+        with open(os.path.join(history.root, day_of(now - 5), _filename('TCS')), 'ab') as f:
+            f.write(b'\x00' * 7)
+
+        history.append('TCS', 3891.0, 'nse', ts=now - 1)
+        history.flush()
+        ticks = history.read('TCS', now - 60)
+        self.assertEqual(ticks['price'].tolist(), [3890.5, 3891.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
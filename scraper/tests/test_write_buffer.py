@@ -0,0 +1,151 @@
+"""
+Batched Supabase writes.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from write_buffer import WriteBuffer  # noqa: E402
+
+
+class FakeQuery:
+    def __init__(self, client, table: str, action: str, payload):
+        self.client = client
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.ids = None
+
+    def in_(self, column, ids):
+        self.ids = list(ids)
+        return self
+
+    def execute(self):
+        self.client.requests.append(self)
+        if self.client.reject(self):
+            raise Exception(f"rejected {self.table} {self.action}")
+        return self
+
+
+class FakeTable:
+    def __init__(self, client, name: str):
+        self.client = client
+        self.name = name
+
+    def insert(self, rows):
+        return FakeQuery(self.client, self.name, 'insert', rows)
+
+    def update(self, values):
+        return FakeQuery(self.client, self.name, 'update', values)
+
+
+class FakeClient:
+    """Records every request; `reject(query)` decides which ones fail"""
+
+    def __init__(self, reject=None):
+        self.requests = []
+        self.reject = reject or (lambda query: False)
+
+    def table(self, name: str):
+        return FakeTable(self, name)
+
+    def rpc(self, name: str, params):
+        return FakeQuery(self, name, 'rpc', params)
+
+    def made(self, table: str, action: str):
+        return [q for q in self.requests if q.table == table and q.action == action]
+
+
+def alert_row(stock_id: int) -> dict:
+    return {'stock_id': stock_id, 'user_id': 1, 'alert_type': 'profit'}
+
+
+class AlertInsertTest(unittest.TestCase):
+
+    def test_alerts_go_in_one_insert(self):
+        client = FakeClient()
+        writes = WriteBuffer(client, flush_every=1000)
+        for stock_id in (1, 2, 3):
+            writes.insert_alert(alert_row(stock_id), sent_at='2026-01-01T10:00:00')
+        writes.flush()
+        self.assertEqual(len(client.made('alerts', 'insert')), 1)
+        updates = client.made('stocks', 'update')
+        self.assertEqual(sorted(updates[0].ids), [1, 2, 3])
+
+    def test_bad_row_does_not_lose_the_others(self):
+        # Batches containing stock 2 are rejected
+        client = FakeClient(lambda q: q.action == 'insert' and any(r['stock_id'] == 2 for r in q.payload))
+        writes = WriteBuffer(client, flush_every=1000)
+        failed = []
+        for stock_id in (1, 2, 3):
+            writes.insert_alert(alert_row(stock_id), on_failure=lambda stock_id=stock_id: failed.append(stock_id))
+        writes.flush()
+
+        self.assertEqual(failed, [2])
+        inserted = [r['stock_id'] for q in client.made('alerts', 'insert') if not client.reject(q) for r in q.payload]
+        self.assertEqual(sorted(inserted), [1, 3])
+        # last_alert_sent only for the stocks whose alert row exists
+        self.assertEqual(sorted(client.made('stocks', 'update')[0].ids), [1, 3])
+
+
+class LastPriceTest(unittest.TestCase):
+
+    def test_prices_go_through_one_rpc(self):
+        client = FakeClient()
+        writes = WriteBuffer(client, flush_every=1000)
+        for stock_id in range(1, 6):
+            writes.update_last_price(stock_id, 100.0 + stock_id)
+        writes.update_last_price(1, 99.0)
+        writes.flush()
+
+        rpcs = client.made('update_last_prices', 'rpc')
+        self.assertEqual(len(rpcs), 1)
+        self.assertEqual(len(client.requests), 1)
+        # Only the latest price per stock is sent
+        prices = {row['id']: row['price'] for row in rpcs[0].payload['prices']}
+        self.assertEqual(prices, {1: 99.0, 2: 102.0, 3: 103.0, 4: 104.0, 5: 105.0})
+
+    def test_missing_rpc_falls_back_to_one_update_per_price(self):
+        client = FakeClient(lambda q: q.action == 'rpc')
+        writes = WriteBuffer(client, flush_every=1000)
+        for stock_id, price in ((1, 10.0), (2, 10.0), (3, 20.0)):
+            writes.update_last_price(stock_id, price)
+        writes.flush()
+
+        updates = client.made('stocks', 'update')
+        self.assertEqual(sorted((q.payload['last_price'], sorted(q.ids)) for q in updates),
+                         [(10.0, [1, 2]), (20.0, [3])])
+
+        # The missing function is remembered: no second RPC attempt
+        writes.update_last_price(1, 11.0)
+        writes.flush()
+        self.assertEqual(len(client.made('update_last_prices', 'rpc')), 1)
+
+    def test_flushes_itself_when_the_batch_is_full(self):
+        client = FakeClient()
+        writes = WriteBuffer(client, flush_every=3)
+        writes.update_last_price(1, 10.0)
+        writes.insert_error({'user_id': 1, 'stock_symbol': 'TCS', 'error_message': 'x'})
+        self.assertEqual(client.requests, [])
+        writes.insert_error({'user_id': 1, 'stock_symbol': 'INFY', 'error_message': 'y'})
+        self.assertEqual(len(client.made('update_last_prices', 'rpc')), 1)
+        self.assertEqual(len(client.made('error_logs', 'insert')[0].payload), 2)
+
+    def test_dry_run_writes_nothing(self):
+        client = FakeClient()
+        writes = WriteBuffer(client, flush_every=1000)
+        writes.dry_run = True
+        writes.update_last_price(1, 10.0)
+        writes.insert_alert(alert_row(1))
+        writes.flush()
+        self.assertEqual(client.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
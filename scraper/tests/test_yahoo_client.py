@@ -0,0 +1,92 @@
+"""
+Yahoo client fallbacks.
+
+    python -m unittest discover -s scraper/tests
+"""
+
+import os
+import sys
+import unittest
+
+SCRAPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRAPER_DIR)
+
+from providers import ProviderUnavailable  # noqa: E402
+from yahoo_client import YahooClient, YAHOO_CHART_URL, YAHOO_CRUMB_URL, YAHOO_QUOTE_URL  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, payload=None, text: str = ''):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = text
+
+    def json(self):
+        return self._payload
+
+
+class CrumbRefusedSession:
+    """Yahoo as seen from a datacenter IP: no crumb, but the chart endpoint works"""
+
+    def __init__(self):
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.startswith(YAHOO_CHART_URL.split('{')[0]):
+            return FakeResponse(200, {'chart': {'result': [{'meta': {'regularMarketPrice': 100.0}}]}})
+        return FakeResponse(403, text='Forbidden')
+
+
+class CrumbBackoffTest(unittest.TestCase):
+
+    def test_refused_crumb_is_not_requested_again(self):
+        client = YahooClient()
+        client.session = CrumbRefusedSession()
+        for symbol in ('TCS.NS', 'INFY.NS', 'RELIANCE.NS'):
+            self.assertEqual(client.get_quotes([symbol]), {symbol: 100.0})
+        # One cookie + crumb attempt, then one chart call per lookup
+        self.assertEqual(len(client.session.urls), 2 + 3)
+
+
+class QuoteStatusSession:
+    """A crumb is handed out; the v7 quote endpoint answers with `status`"""
+
+    def __init__(self, status: int):
+        self.status = status
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url == YAHOO_CRUMB_URL:
+            return FakeResponse(200, text='crumb')
+        if url == YAHOO_QUOTE_URL:
+            return FakeResponse(self.status, {})
+        if url.startswith(YAHOO_CHART_URL.split('{')[0]):
+            return FakeResponse(200, {'chart': {'result': [{'meta': {'regularMarketPrice': 100.0}}]}})
+        return FakeResponse(200)
+
+    def chart_calls(self) -> int:
+        return sum(url.startswith(YAHOO_CHART_URL.split('{')[0]) for url in self.urls)
+
+
+class QuoteBatchFailureTest(unittest.TestCase):
+
+    def test_outage_raises_without_chart_fallback(self):
+        for status in (401, 403, 429, 500, 503):
+            with self.subTest(status=status):
+                client = YahooClient()
+                client.session = QuoteStatusSession(status)
+                with self.assertRaises(ProviderUnavailable):
+                    client.get_quotes(['TCS.NS', 'INFY.NS'])
+                self.assertEqual(client.session.chart_calls(), 0)
+
+    def test_unusable_answer_falls_back_to_chart(self):
+        client = YahooClient()
+        client.session = QuoteStatusSession(404)
+        self.assertEqual(client.get_quotes(['TCS.NS', 'INFY.NS']), {'TCS.NS': 100.0, 'INFY.NS': 100.0})
+        self.assertEqual(client.session.chart_calls(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
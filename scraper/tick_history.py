@@ -0,0 +1,161 @@
+"""
+Append-only history of every fetched quote, for intraday charts and history-based alert rules.
+
+One directory per UTC day (the NSE session falls inside a single UTC day), one
+file per symbol holding fixed-width records (see TICK_DTYPE). Files are only
+ever appended to and are read back with numpy.memmap, so a range read touches
+just the days it spans.
+
+Print a symbol's ticks as replay lines (`--replay` accepts them):
+
+    python scraper/tick_history.py TCS --hours 6
+"""
+
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import threading
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from quote_cache import normalize_symbol
+from symbol_resolver import CACHE_DIR
+
+log = logging.getLogger(__name__)
+
+TICK_HISTORY_DIR = os.environ.get("TICK_HISTORY_DIR", os.path.join(CACHE_DIR, 'ticks'))
+# Day partitions older than this are deleted (0 keeps everything)
+TICK_HISTORY_DAYS = int(os.environ.get("TICK_HISTORY_DAYS", "30"))
+
+# 32 bytes per tick: epoch seconds, price, provider name
+TICK_DTYPE = np.dtype([('ts', '<f8'), ('price', '<f8'), ('source', 'S16')])
+
+
+def day_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def _filename(symbol: str) -> str:
+    # Keys are upper-case tickers or company names; keep them filesystem-safe
+    key = normalize_symbol(symbol)
+    return ''.join(c if c.isalnum() or c in '-_&' else '_' for c in key) + '.ticks'
+
+
+class TickHistory:
+    """
+    Buffers ticks in memory and appends them to their day/symbol files on flush().
+    Safe to call append() from the quote workers.
+    """
+
+    def __init__(self, root: str = TICK_HISTORY_DIR, keep_days: int = TICK_HISTORY_DAYS):
+        self.root = root
+        self.keep_days = keep_days
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, float, float, str]] = []
+        self._pruned_day: Optional[str] = None
+
+    def append(self, symbol: str, price: float, source: Optional[str], ts: Optional[float] = None):
+        with self._lock:
+            self._pending.append((symbol, ts or time.time(), price, source or ''))
+
+    def append_many(self, prices: Dict[str, float], source: str, ts: Optional[float] = None):
+        ts = ts or time.time()
+        with self._lock:
+            self._pending.extend((symbol, ts, price, source) for symbol, price in prices.items())
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Append the buffered ticks to disk; returns how many were written"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        files: Dict[str, List[Tuple[float, float, bytes]]] = {}
+        for symbol, ts, price, source in pending:
+            path = os.path.join(self.root, day_of(ts), _filename(symbol))
+            files.setdefault(path, []).append((ts, price, source.encode('utf-8')[:16]))
+
+        written = 0
+        for path, rows in files.items():
+            records = np.array(sorted(rows), dtype=TICK_DTYPE)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'ab') as f:
+                    # Drop a partial record left by an interrupted write, or everything after it is misaligned
+                    size = f.seek(0, os.SEEK_END)
+                    torn = size % TICK_DTYPE.itemsize
+                    if torn:
+                        log.warning(f"Dropping {torn} byte(s) of a partial tick record in {path}")
+                        f.truncate(size - torn)
+                    f.write(records.tobytes())
+                written += len(records)
+            except OSError as e:
+                log.warning(f"Could not write tick history to {path}: {e}")
+
+        self._prune()
+        return written
+
+    def _prune(self):
+        """Drop day partitions past the retention window (checked once per day)"""
+        today = day_of(time.time())
+        if not self.keep_days or self._pruned_day == today:
+            return
+        self._pruned_day = today
+        oldest = day_of(time.time() - self.keep_days * 86400)
+        try:
+            days = os.listdir(self.root)
+        except OSError:
+            return
+        for day in days:
+            if day < oldest:
+                shutil.rmtree(os.path.join(self.root, day), ignore_errors=True)
+
+    def days(self, start: float, end: float) -> List[str]:
+        first = datetime.fromtimestamp(start, tz=timezone.utc).date()
+        last = datetime.fromtimestamp(end, tz=timezone.utc).date()
+        return [(first + timedelta(days=n)).isoformat() for n in range((last - first).days + 1)]
+
+    def read(self, symbol: str, start: float, end: Optional[float] = None) -> np.ndarray:
+        """
+        Ticks of `symbol` with start <= ts < end (end defaults to now), oldest first,
+        as a TICK_DTYPE array. Unflushed ticks are not included.
+        """
+        end = end if end is not None else time.time()
+        chunks = []
+        for day in self.days(start, end):
+            path = os.path.join(self.root, day, _filename(symbol))
+            if not os.path.exists(path) or os.path.getsize(path) < TICK_DTYPE.itemsize:
+                continue
+            # A write cut short leaves a partial record at the end: skip it (the next flush truncates it)
+            count = os.path.getsize(path) // TICK_DTYPE.itemsize
+            ticks = np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+            ts = ticks['ts']
+            chunks.append(np.array(ticks[(ts >= start) & (ts < end)]))
+
+        if not chunks:
+            return np.empty(0, dtype=TICK_DTYPE)
+        ticks = np.concatenate(chunks)
+        return ticks[np.argsort(ticks['ts'], kind='stable')]
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Print a symbol's recorded ticks as SYMBOL,price,ts lines")
+    parser.add_argument('symbol')
+    parser.add_argument('--hours', type=float, default=24, help="How far back to read (default: 24)")
+    parser.add_argument('--root', default=TICK_HISTORY_DIR)
+    args = parser.parse_args(argv)
+
+    ticks = TickHistory(args.root).read(args.symbol, time.time() - args.hours * 3600)
+    for tick in ticks:
+        print(f"{args.symbol},{tick['price']},{tick['ts']:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
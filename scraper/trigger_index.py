@@ -0,0 +1,130 @@
+import bisect
+import logging
+import threading
+from typing import Dict, Iterable, List, Tuple
+from quote_cache import normalize_symbol
+from positions import Position
+
+log = logging.getLogger(__name__)
+
+# Sorts after every stock id, so bisecting (price, _ANY_ID) lands past all entries at `price`
+_ANY_ID = float('inf')
+
+
+class TriggerIndex:
+    """
+    Active positions per symbol, kept sorted by profit_target and by loss_target.
+    For a new price, the crossed positions are a prefix of the profit list
+    (target <= price) and a suffix of the loss list (target >= price), found by bisect.
+    Positions are added, removed or toggled incrementally.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # stock id -> (symbol key, profit_target, loss_target)
+        self._entries: Dict[int, Tuple[str, float, float]] = {}
+        self._positions: Dict[int, Position] = {}
+        # symbol key -> sorted [(target, stock id)]
+        self._profit: Dict[str, List[Tuple[float, int]]] = {}
+        self._loss: Dict[str, List[Tuple[float, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _unlink(self, stock_id: int):
+        key, profit_target, loss_target = self._entries.pop(stock_id)
+        self._positions.pop(stock_id, None)
+        for lists, target in ((self._profit, profit_target), (self._loss, loss_target)):
+            entries = lists[key]
+            i = bisect.bisect_left(entries, (target, stock_id))
+            if i < len(entries) and entries[i] == (target, stock_id):
+                del entries[i]
+            if not entries:
+                del lists[key]
+
+    def add(self, position: Position):
+        """Insert or update a position"""
+        stock_id = position.id
+        entry = (position.key, position.profit_target, position.loss_target)
+        with self._lock:
+            if self._entries.get(stock_id) == entry:
+                # Targets unchanged: just keep the latest object (cooldown, profile, ...)
+                self._positions[stock_id] = position
+                return
+            if stock_id in self._entries:
+                self._unlink(stock_id)
+
+            self._entries[stock_id] = entry
+            self._positions[stock_id] = position
+            bisect.insort(self._profit.setdefault(position.key, []), (position.profit_target, stock_id))
+            bisect.insort(self._loss.setdefault(position.key, []), (position.loss_target, stock_id))
+
+    def remove(self, stock_id: int) -> bool:
+        """Drop a position (deleted or deactivated). Returns whether it was indexed."""
+        with self._lock:
+            if stock_id not in self._entries:
+                return False
+            self._unlink(stock_id)
+            return True
+
+    def set_active(self, position: Position, active: bool):
+        """Apply an is_active toggle"""
+        if active:
+            self.add(position)
+        else:
+            self.remove(position.id)
+
+    def sync(self, positions: Iterable[Position]) -> Tuple[int, int, int]:
+        """
+        Make the index match a fresh list of active positions, touching only what changed.
+        Returns: (added, updated, removed)
+        """
+        added = updated = 0
+        seen = set()
+        for position in positions:
+            seen.add(position.id)
+            with self._lock:
+                previous = self._entries.get(position.id)
+            self.add(position)
+            if previous is None:
+                added += 1
+            elif previous != self._entries.get(position.id):
+                updated += 1
+
+        with self._lock:
+            gone = [stock_id for stock_id in self._entries if stock_id not in seen]
+            for stock_id in gone:
+                self._unlink(stock_id)
+        return added, updated, len(gone)
+
+    def symbols(self) -> List[str]:
+        """One symbol (as stored on the position) per indexed symbol"""
+        with self._lock:
+            return [self._positions[entries[0][1]].symbol for entries in self._profit.values()]
+
+    def positions(self, symbol: str) -> List[Position]:
+        """Every indexed position on a symbol"""
+        with self._lock:
+            return [self._positions[stock_id] for _, stock_id in self._profit.get(normalize_symbol(symbol), [])]
+
+    def crossed(self, symbol: str, price: float) -> Tuple[List[Position], List[Position]]:
+        """
+        Positions whose targets this price crosses.
+        Returns: (profit positions, loss positions); a position crossing both counts as profit.
+        """
+        key = normalize_symbol(symbol)
+        with self._lock:
+            profit_entries = self._profit.get(key, [])
+            loss_entries = self._loss.get(key, [])
+
+            profit_ids = [stock_id for _, stock_id in
+                          profit_entries[:bisect.bisect_right(profit_entries, (price, _ANY_ID))]]
+            loss_ids = [stock_id for _, stock_id in
+                        loss_entries[bisect.bisect_left(loss_entries, (price, -_ANY_ID)):]]
+
+            if profit_ids and loss_ids:
+                profit_set = set(profit_ids)
+                loss_ids = [stock_id for stock_id in loss_ids if stock_id not in profit_set]
+
+            return ([self._positions[stock_id] for stock_id in profit_ids],
+                    [self._positions[stock_id] for stock_id in loss_ids])
@@ -0,0 +1,178 @@
+import os
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from rate_limiter import throttle
+
+log = logging.getLogger(__name__)
+
+# Flush automatically once this many mutations are pending
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "200"))
+
+# Keep `.in_('id', ...)` filters well under PostgREST/URL length limits
+ID_CHUNK_SIZE = 200
+# Rows per update_last_prices call (sent in the request body, so no URL limit)
+LAST_PRICE_CHUNK_SIZE = int(os.environ.get("LAST_PRICE_CHUNK_SIZE", "1000"))
+
+
+def _chunks(items: List, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer for the scraper's Supabase mutations.
+    last_price / last_alert_sent updates and alerts / error_logs inserts are
+    collected during a run and flushed as a handful of batched requests,
+    either every `flush_every` mutations or when flush() is called.
+    last_price goes through the update_last_prices RPC (see README) when it
+    exists, otherwise one update per distinct price.
+    With `dry_run` set, flush() logs what it would write and drops it.
+    """
+
+    def __init__(self, client, flush_every: int = WRITE_BATCH_SIZE):
+        self._client = client
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._last_prices: Dict[int, float] = {}
+        # (alert row, last_alert_sent for its stock, called if the row can't be inserted)
+        self._alerts: List[Tuple[Dict, str, Optional[Callable[[], None]]]] = []
+        self._errors: List[Dict] = []
+        self._last_prices_rpc = True
+        self.dry_run = False
+
+    def _pending(self) -> int:
+        return len(self._last_prices) + len(self._alerts) + len(self._errors)
+
+    def _added(self):
+        if self._pending() >= self.flush_every:
+            self.flush()
+
+    def update_last_price(self, stock_id: int, price: float):
+        with self._lock:
+            self._last_prices[stock_id] = price
+        self._added()
+
+    def insert_alert(self, row: Dict, sent_at: str = None, on_failure: Callable[[], None] = None):
+        """
+        Queue an alert row; its stock's last_alert_sent is only updated once the row is in.
+        `on_failure` is called if the row can't be inserted.
+        """
+        with self._lock:
+            self._alerts.append((row, sent_at or datetime.now().isoformat(), on_failure))
+        self._added()
+
+    def insert_error(self, row: Dict):
+        with self._lock:
+            self._errors.append(row)
+        self._added()
+
+    def flush(self):
+        """Write everything collected so far"""
+        with self._lock:
+            last_prices, self._last_prices = self._last_prices, {}
+            alerts, self._alerts = self._alerts, []
+            errors, self._errors = self._errors, []
+
+        if self.dry_run:
+            if last_prices or alerts or errors:
+                log.info(f"Dry run: not writing {len(last_prices)} last_price update(s), "
+                         f"{len(alerts)} alert(s), {len(errors)} error log(s)")
+            return
+
+        alert_sent: Dict[int, str] = {}
+        for row, sent_at, _ in self._insert_alerts(alerts):
+            alert_sent[row['stock_id']] = max(sent_at, alert_sent.get(row['stock_id'], sent_at))
+
+        if alert_sent:
+            # One timestamp per flush so all rows go in a single update per chunk;
+            # the latest keeps every cooldown at least as long as intended
+            sent_at = max(alert_sent.values())
+            for ids in _chunks(list(alert_sent), ID_CHUNK_SIZE):
+                try:
+                    throttle('supabase')
+                    self._client.table('stocks').update({
+                        'last_alert_sent': sent_at
+                    }).in_('id', ids).execute()
+                except Exception as e:
+                    log.error(f"Error updating last_alert_sent for {len(ids)} stock(s): {e}")
+
+        if last_prices:
+            if self._last_prices_rpc:
+                last_prices = self._update_last_prices_rpc(last_prices)
+            if last_prices:
+                self._update_last_prices_by_price(last_prices)
+
+        if errors:
+            try:
+                throttle('supabase')
+                self._client.table('error_logs').insert(errors).execute()
+            except Exception as e:
+                log.error(f"Failed to log {len(errors)} error(s) to DB: {e}")
+
+    def _insert_alerts(self, alerts: List[Tuple[Dict, str, Optional[Callable[[], None]]]]) -> List:
+        """
+        Insert the alert rows in one request; if that is rejected, row by row so one
+        bad row doesn't lose the rest. Returns the entries that were inserted.
+        """
+        if not alerts:
+            return []
+        if len(alerts) > 1:
+            try:
+                throttle('supabase')
+                self._client.table('alerts').insert([row for row, _, _ in alerts]).execute()
+                log.info(f"Recorded {len(alerts)} alert(s)")
+                return alerts
+            except Exception as e:
+                log.error(f"Error recording {len(alerts)} alert(s), retrying one at a time: {e}")
+
+        inserted = []
+        for entry in alerts:
+            row, _, on_failure = entry
+            try:
+                throttle('supabase')
+                self._client.table('alerts').insert([row]).execute()
+                inserted.append(entry)
+            except Exception as e:
+                log.error(f"Error recording alert for stock_id={row.get('stock_id')}: {e}")
+                if on_failure:
+                    on_failure()
+        if inserted:
+            log.info(f"Recorded {len(inserted)} alert(s)")
+        return inserted
+
+    def _update_last_prices_rpc(self, last_prices: Dict[int, float]) -> Dict[int, float]:
+        """
+        All last_price updates in one RPC per chunk of rows.
+        Returns the updates still to write (everything if the function doesn't exist).
+        """
+        rows = [{'id': stock_id, 'price': price} for stock_id, price in last_prices.items()]
+        for i, chunk in enumerate(_chunks(rows, LAST_PRICE_CHUNK_SIZE)):
+            try:
+                throttle('supabase')
+                self._client.rpc('update_last_prices', {'prices': chunk}).execute()
+            except Exception as e:
+                if i == 0 and 'update_last_prices' in str(e):
+                    log.info("update_last_prices() not found, updating last_price per distinct price")
+                    self._last_prices_rpc = False
+                    return last_prices
+                log.warning(f"Could not update last_price for {len(chunk)} stock(s): {e}")
+        return {}
+
+    def _update_last_prices_by_price(self, last_prices: Dict[int, float]):
+        # Positions on the same symbol share a price, so group ids by price
+        by_price: Dict[float, List[int]] = {}
+        for stock_id, price in last_prices.items():
+            by_price.setdefault(price, []).append(stock_id)
+
+        for price, stock_ids in by_price.items():
+            for ids in _chunks(stock_ids, ID_CHUNK_SIZE):
+                try:
+                    throttle('supabase')
+                    self._client.table('stocks').update({
+                        'last_price': price
+                    }).in_('id', ids).execute()
+                except Exception as e:
+                    log.warning(f"Could not update last_price for {len(ids)} stock(s) (Column might be missing): {e}")
@@ -0,0 +1,200 @@
+import os
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, List, Optional
+from rate_limiter import throttle
+from providers import ProviderUnavailable
+
+log = logging.getLogger(__name__)
+
+YAHOO_QUOTE_URL = 'https://query1.finance.yahoo.com/v7/finance/quote'
+YAHOO_CHART_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/{symbol}'
+YAHOO_CRUMB_URL = 'https://query1.finance.yahoo.com/v1/test/getcrumb'
+# Any Yahoo page works for the consent cookie the crumb is tied to
+YAHOO_COOKIE_URL = 'https://fc.yahoo.com'
+
+YAHOO_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+# Symbols per v7 quote request
+QUOTE_BATCH_SIZE = 50
+# After Yahoo refuses a crumb, use the chart endpoint only for this long before asking again
+YAHOO_CRUMB_RETRY_SECONDS = int(os.environ.get("YAHOO_CRUMB_RETRY_SECONDS", "900"))
+
+
+class YahooClient:
+    """
+    Lean Yahoo Finance quote client.
+    Reads prices straight from the quote/chart JSON (no yfinance, no pandas),
+    asks for many symbols per request and reuses one pooled session.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: int = 10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(YAHOO_HEADERS)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._crumb: Optional[str] = None
+        # monotonic time before which we don't ask for a crumb again
+        self._crumb_retry_at = 0.0
+
+    def _get_crumb(self, refresh: bool = False) -> Optional[str]:
+        """
+        The v7 quote endpoint needs a cookie + crumb pair; fetch it once.
+        A refusal is remembered for YAHOO_CRUMB_RETRY_SECONDS (callers use the chart endpoint meanwhile).
+        """
+        with self._lock:
+            if self._crumb and not refresh:
+                return self._crumb
+            if time.monotonic() < self._crumb_retry_at:
+                return None
+            try:
+                throttle('yahoo')
+                self.session.get(YAHOO_COOKIE_URL, timeout=self.timeout)
+                throttle('yahoo')
+                response = self.session.get(YAHOO_CRUMB_URL, timeout=self.timeout)
+                crumb = response.text.strip()
+                self._crumb = crumb if response.status_code == 200 and crumb else None
+            except Exception as e:
+                log.warning(f"Could not get Yahoo crumb: {e}")
+                self._crumb = None
+            if self._crumb is None:
+                log.warning(f"Yahoo crumb refused, using the chart endpoint for {YAHOO_CRUMB_RETRY_SECONDS}s")
+                self._crumb_retry_at = time.monotonic() + YAHOO_CRUMB_RETRY_SECONDS
+            return self._crumb
+
+    def _get_quote_batch(self, symbols: List[str]) -> Optional[Dict[str, float]]:
+        """
+        One v7 quote request.
+        None if there is no crumb or the answer is unusable (callers fall back to the chart endpoint);
+        ProviderUnavailable if Yahoo is down, throttling us, or still refusing after a fresh crumb.
+        """
+        for attempt in range(2):
+            crumb = self._get_crumb(refresh=attempt > 0)
+            if not crumb:
+                return None
+
+            throttle('yahoo')
+            try:
+                response = self.session.get(
+                    YAHOO_QUOTE_URL,
+                    params={'symbols': ','.join(symbols), 'crumb': crumb},
+                    timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                raise ProviderUnavailable(f"Yahoo quote request failed: {e}") from e
+            if response.status_code in (401, 403) and attempt == 0:
+                continue
+            if response.status_code in (401, 403, 429) or response.status_code >= 500:
+                raise ProviderUnavailable(f"Yahoo quote API returned status {response.status_code}")
+            if response.status_code != 200:
+                log.warning(f"Yahoo quote API returned status {response.status_code}")
+                return None
+
+            try:
+                rows = response.json().get('quoteResponse', {}).get('result') or []
+                prices = {}
+                for row in rows:
+                    price = row.get('regularMarketPrice')
+                    if row.get('symbol') and price is not None:
+                        prices[row['symbol'].upper()] = float(price)
+            except (ValueError, TypeError, AttributeError) as e:
+                log.warning(f"Unexpected Yahoo quote response: {e}")
+                return None
+            return prices
+        return None
+
+    def get_chart_price(self, symbol: str) -> Optional[float]:
+        """
+        Single-symbol fallback via the chart endpoint (no crumb needed).
+        None for a symbol Yahoo doesn't know; ProviderUnavailable if Yahoo is down or refusing us.
+        """
+        throttle('yahoo')
+        try:
+            response = self.session.get(
+                YAHOO_CHART_URL.format(symbol=symbol),
+                params={'range': '1d', 'interval': '1d'},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise ProviderUnavailable(f"Yahoo chart request failed: {e}") from e
+        if response.status_code in (401, 403, 429) or response.status_code >= 500:
+            raise ProviderUnavailable(f"Yahoo chart API returned status {response.status_code}")
+        if response.status_code != 200:
+            return None
+
+        results = response.json().get('chart', {}).get('result') or []
+        if results:
+            price = results[0].get('meta', {}).get('regularMarketPrice')
+            if price is not None:
+                return float(price)
+        return None
+
+    def get_quotes(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Prices for many Yahoo symbols (e.g. 'RELIANCE.NS').
+        Returns: {symbol (upper-case): price} for the symbols Yahoo knows.
+        Raises ProviderUnavailable if Yahoo failed for every symbol.
+        The chart endpoint is only used when the quote endpoint can't be asked (no crumb)
+        or gave an unusable answer, never to retry an outage or a 429 one symbol at a time.
+        """
+        wanted = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        prices: Dict[str, float] = {}
+        answered = False
+        unavailable: Optional[ProviderUnavailable] = None
+
+        for i in range(0, len(wanted), QUOTE_BATCH_SIZE):
+            batch = wanted[i:i + QUOTE_BATCH_SIZE]
+            try:
+                batch_prices = self._get_quote_batch(batch)
+            except ProviderUnavailable as e:
+                log.warning(f"Yahoo quote batch failed, skipping the remaining batches: {e}")
+                unavailable = e
+                break
+            except Exception as e:
+                log.warning(f"Yahoo quote batch failed: {e}")
+                batch_prices = None
+
+            if batch_prices is not None:
+                prices.update(batch_prices)
+                answered = True
+                continue
+
+            # Quote endpoint unavailable: fall back to one chart call per symbol
+            for symbol in batch:
+                try:
+                    price = self.get_chart_price(symbol)
+                    answered = True
+                    if price is not None:
+                        prices[symbol] = price
+                except ProviderUnavailable as e:
+                    log.warning(f"Yahoo chart request failed for {symbol}: {e}")
+                    unavailable = e
+                except Exception as e:
+                    log.warning(f"Yahoo chart request failed for {symbol}: {e}")
+
+        if unavailable is not None and not answered:
+            raise unavailable
+        return prices
+
+
+_client: Optional[YahooClient] = None
+_client_lock = threading.Lock()
+
+
+def get_yahoo_client() -> YahooClient:
+    """Return the process-wide Yahoo client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = YahooClient()
+    return _client